@@ -0,0 +1,145 @@
+import time
+
+import cv2
+import numpy as np
+
+FULL_FRAME = (0.0, 0.0, 1.0, 1.0)
+
+
+# Coordinate helpers (all boxes are normalized (x0, y0, x1, y1) of the full frame)
+def map_landmarks(points, region):
+    """(n, 3) landmark array normalized to a cropped `region` -> normalized to the full frame."""
+    if region == FULL_FRAME:
+        return points
+    x0, y0, x1, y1 = region
+    width, height = x1 - x0, y1 - y0
+    return points * np.array([width, height, width], dtype=points.dtype) + np.array([x0, y0, 0.0], dtype=points.dtype)
+
+
+def region_frame_size(image, region):
+    # Pixel size of the whole frame at the scale `image` (a crop or a resized frame) was taken at
+    x0, y0, x1, y1 = region
+    height, width = image.shape[:2]
+    return width / (x1 - x0), height / (y1 - y0)
+
+
+def landmark_box(points):
+    x0, y0 = points[:, :2].min(axis=0)
+    x1, y1 = points[:, :2].max(axis=0)
+    return float(x0), float(y0), float(x1), float(y1)
+
+
+def expand_box(box, margin):
+    x0, y0, x1, y1 = box
+    dx, dy = (x1 - x0) * margin, (y1 - y0) * margin
+    return max(0.0, x0 - dx), max(0.0, y0 - dy), min(1.0, x1 + dx), min(1.0, y1 + dy)
+
+
+def contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+
+class AdaptiveScheduler:
+    """Decides per frame whether to run inference, and on what part of the frame.
+
+    `infer(image, region) -> (result, metrics, box)` runs the model on `image`,
+    which is `region` of the frame (FULL_FRAME, possibly downscaled, or a crop
+    around the last face). It returns its raw result, a dict of numeric metrics
+    and the face box in full-frame coordinates, or box None when no face is found.
+
+    Inference runs at most `target_fps` times per second and, with
+    `cpu_budget` (fraction of one core), no more often than the measured
+    inference time allows. While the `stable_keys` metrics moved less than
+    `stable_delta` between the last two inferences the interval grows by
+    `stable_multiplier`. Skipped frames repeat the metrics of the last inference.
+    A face lost inside the crop triggers an immediate full-frame retry.
+    """
+
+    def __init__(self, infer, target_fps=10.0, cpu_budget=None, scale=0.5, use_roi=True, roi_margin=0.4,
+                 stable_keys=(), stable_delta=2.0, stable_multiplier=3.0):
+        self.infer = infer
+        self.target_fps = target_fps
+        self.cpu_budget = cpu_budget
+        self.scale = scale
+        self.use_roi = use_roi
+        self.roi_margin = roi_margin
+        self.stable_keys = stable_keys
+        self.stable_delta = stable_delta
+        self.stable_multiplier = stable_multiplier
+        self.history = []  # (time, metrics) of the last two inferences
+        self.result = None
+        self.box = None
+        self.region = FULL_FRAME
+        self.inference_seconds = None
+        self.counts = dict.fromkeys(["full", "roi", "fallback", "skip"], 0)
+
+    # Scheduling
+    def interval(self):
+        interval = 1.0 / self.target_fps
+        if self.cpu_budget and self.inference_seconds:
+            interval = max(interval, self.inference_seconds / self.cpu_budget)
+        if self.box is not None and self.stable():
+            interval *= self.stable_multiplier
+        return interval
+
+    def stable(self):
+        if len(self.history) < 2 or not self.stable_keys:
+            return False
+        (_, before), (_, after) = self.history
+        return all(abs(after[key] - before[key]) < self.stable_delta
+                   for key in self.stable_keys if key in before and key in after)
+
+    def due(self, now):
+        return not self.history or now - self.history[-1][0] >= self.interval()
+
+    # Inference
+    def _run(self, frame, region):
+        height, width = frame.shape[:2]
+        if region == FULL_FRAME:
+            image = frame
+            if self.scale < 1.0:
+                image = cv2.resize(frame, (max(1, int(width * self.scale)), max(1, int(height * self.scale))),
+                                   interpolation=cv2.INTER_AREA)
+        else:
+            x0, y0, x1, y1 = region
+            image = frame[int(y0 * height):int(y1 * height), int(x0 * width):int(x1 * width)]
+        start = time.perf_counter()
+        output = self.infer(image, region)
+        elapsed = time.perf_counter() - start
+        # Exponential moving average of inference cost for the CPU budget
+        self.inference_seconds = elapsed if self.inference_seconds is None else \
+            0.8 * self.inference_seconds + 0.2 * elapsed
+        return output
+
+    def _choose_region(self):
+        if not self.use_roi or self.box is None:
+            return FULL_FRAME
+        # The crop only moves when the face nears its edge, so consecutive crops line up
+        if self.region == FULL_FRAME or not contains(self.region, expand_box(self.box, self.roi_margin / 4)):
+            self.region = expand_box(self.box, self.roi_margin)
+        return self.region
+
+    def _held_metrics(self):
+        # Live frames are newer than every inference, so there is no later sample to interpolate towards
+        return dict(self.history[-1][1]) if self.history else {}
+
+    def step(self, frame, now=None):
+        """(result, metrics, mode) for this frame; mode is full, roi, fallback or skip."""
+        now = time.perf_counter() if now is None else now
+        if not self.due(now):
+            self.counts["skip"] += 1
+            return self.result, self._held_metrics(), "skip"
+
+        region = self._choose_region()
+        result, metrics, box = self._run(frame, region)
+        mode = "full" if region == FULL_FRAME else "roi"
+        if box is None and region != FULL_FRAME:
+            result, metrics, box = self._run(frame, FULL_FRAME)
+            mode = "fallback"
+        if box is None:
+            self.region = FULL_FRAME
+        self.counts[mode] += 1
+
+        self.result, self.box = result, box
+        self.history = (self.history + [(now, metrics)])[-2:]
+        return result, dict(metrics), mode
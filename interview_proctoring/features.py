@@ -0,0 +1,80 @@
+import math
+
+import cv2
+import numpy as np
+
+# FaceMesh landmark indices (refine_landmarks=True adds the iris points 468-477).
+# "Left"/"right" are as seen in the image.
+EYE_INNER = (133, 362)
+EYE_LIDS = ((159, 145), (386, 374))      # (upper, lower) per eye
+EYE_CORNERS = ((33, 133), (362, 263))    # (image-left, image-right) per eye
+IRIS_CENTERS = (468, 473)
+MOUTH_LIPS = (13, 14)                    # inner upper, inner lower
+MOUTH_CORNERS = (61, 291)
+# Nose tip, chin, outer eye corners and mouth corners against a generic 3D face
+# (x right, y down, z away from the camera; arbitrary units)
+POSE_LANDMARKS = (1, 152, 33, 263, 61, 291)
+POSE_MODEL = np.array([(0.0, 0.0, 0.0), (0.0, 330.0, 65.0), (-225.0, -170.0, 135.0), (225.0, -170.0, 135.0),
+                       (-150.0, 150.0, 125.0), (150.0, 150.0, 125.0)])
+FEATURE_NAMES = ("angle", "eye_openness", "gaze_x", "gaze_y", "mouth_open", "yaw", "pitch")
+
+
+def landmark_array(landmarks):
+    """(n_landmarks, 3) float32 array of normalized x, y, z; the only per-landmark Python loop per frame."""
+    return np.array([(point.x, point.y, point.z) for point in landmarks], dtype=np.float32)
+
+
+# Vectorized signals: `points` is (..., n_landmarks, 3), so a stack of frames works too
+def head_roll(points):
+    # Tilt of the line between the inner eye corners, in degrees
+    delta = points[..., EYE_INNER[1], :2] - points[..., EYE_INNER[0], :2]
+    return np.degrees(np.arctan2(delta[..., 1], delta[..., 0]))
+
+
+def eye_openness(points):
+    return points[..., EYE_LIDS[0][1], 1] - points[..., EYE_LIDS[0][0], 1]
+
+
+def gaze(points):
+    """Iris offset from the eye centre, averaged over both eyes: (x, y) in [-0.5, 0.5], NaN without iris points."""
+    if points.shape[-2] <= max(IRIS_CENTERS):
+        nan = np.full(points.shape[:-2], np.nan, dtype=np.float32)
+        return nan, nan
+    iris = points[..., IRIS_CENTERS, :]
+    corners = points[..., EYE_CORNERS, :]
+    lids = points[..., EYE_LIDS, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (iris[..., 0] - corners[..., 0, 0]) / (corners[..., 1, 0] - corners[..., 0, 0])
+        y = (iris[..., 1] - lids[..., 0, 1]) / (lids[..., 1, 1] - lids[..., 0, 1])
+    return x.mean(axis=-1) - 0.5, y.mean(axis=-1) - 0.5
+
+
+def mouth_open(points):
+    # Lip gap relative to mouth width, so it does not depend on distance to the camera
+    gap = np.linalg.norm(points[..., MOUTH_LIPS[1], :2] - points[..., MOUTH_LIPS[0], :2], axis=-1)
+    width = np.linalg.norm(points[..., MOUTH_CORNERS[1], :2] - points[..., MOUTH_CORNERS[0], :2], axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return gap / width
+
+
+def head_pose(points, frame_size):
+    """(yaw, pitch) in degrees from solvePnP on one face; 0, 0 is facing the camera."""
+    width, height = frame_size
+    image_points = points[POSE_LANDMARKS, :2].astype(np.float64) * (width, height)
+    camera = np.array([[width, 0, width / 2], [0, width, height / 2], [0, 0, 1]], dtype=np.float64)
+    success, rotation, _ = cv2.solvePnP(POSE_MODEL, image_points, camera, None, flags=cv2.SOLVEPNP_ITERATIVE)
+    if not success:
+        return math.nan, math.nan
+    matrix, _ = cv2.Rodrigues(rotation)
+    yaw = math.degrees(math.asin(max(-1.0, min(1.0, -matrix[2, 0]))))
+    pitch = math.degrees(math.atan2(matrix[2, 1], matrix[2, 2]))
+    return yaw, pitch
+
+
+def extract_features(points, frame_size=None):
+    """All FEATURE_NAMES signals for one face; yaw and pitch need the frame size in pixels (any scale)."""
+    gaze_x, gaze_y = gaze(points)
+    yaw, pitch = head_pose(points, frame_size) if frame_size else (math.nan, math.nan)
+    return {"angle": float(head_roll(points)), "eye_openness": float(eye_openness(points)),
+            "gaze_x": float(gaze_x), "gaze_y": float(gaze_y), "mouth_open": float(mouth_open(points)),
+            "yaw": yaw, "pitch": pitch}
@@ -1,11 +1,37 @@
+import argparse
 import cv2
 import mediapipe as mp
 
+from adaptive import AdaptiveScheduler
+
 mp_face_detection = mp.solutions.face_detection
 mp_drawing = mp.solutions.drawing_utils
 
+parser = argparse.ArgumentParser(description="Live face detection for proctoring.")
+parser.add_argument("--adaptive", action="store_true",
+                    help="detect on downscaled frames and skip frames while the face is still")
+parser.add_argument("--target-fps", type=float, default=10.0, help="adaptive: max detections per second")
+parser.add_argument("--cpu-budget", type=float, default=None,
+                    help="adaptive: fraction of one core detection may use, e.g. 0.25")
+parser.add_argument("--scale", type=float, default=0.5, help="adaptive: downscale factor before detection")
+args = parser.parse_args()
+
 face_detection = mp_face_detection.FaceDetection(model_selection=1, min_detection_confidence=0.5)
 
+def detect(image, region):
+    # Relative boxes are unchanged by downscaling, so held detections can be redrawn on later frames
+    results = face_detection.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    if not results.detections:
+        return [], {}, None
+    box = results.detections[0].location_data.relative_bounding_box
+    # Face centre in percent of the frame, so stability is judged in the scheduler's units
+    metrics = {"x": (box.xmin + box.width / 2) * 100, "y": (box.ymin + box.height / 2) * 100}
+    return results.detections, metrics, (box.xmin, box.ymin, box.xmin + box.width, box.ymin + box.height)
+
+# Detection output is already full-frame, so only downscaling and skipping apply here
+scheduler = AdaptiveScheduler(detect, target_fps=args.target_fps, cpu_budget=args.cpu_budget, scale=args.scale,
+                              use_roi=False, stable_keys=("x", "y")) if args.adaptive else None
+
 cap = cv2.VideoCapture(0)
 print("[INFO] Starting webcam... Press 'q' to quit.")
 
@@ -15,11 +41,13 @@ while cap.isOpened():
         print("[ERROR] Cannot read frame from webcam.")
         break
 
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = face_detection.process(rgb_frame)
+    if scheduler is not None:
+        detections, _, _ = scheduler.step(frame)
+    else:
+        detections = face_detection.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).detections
 
-    if results.detections:
-        for detection in results.detections:
+    if detections:
+        for detection in detections:
             mp_drawing.draw_detection(frame, detection)
         status = "Face Detected"
         color = (0, 255, 0)
@@ -33,5 +61,8 @@ while cap.isOpened():
     if cv2.waitKey(5) & 0xFF == ord('q'):
         break
 
+if scheduler is not None:
+    print("[INFO] Adaptive detection: " + ", ".join(f"{mode}={count}" for mode, count in scheduler.counts.items()))
+
 cap.release()
 cv2.destroyAllWindows()
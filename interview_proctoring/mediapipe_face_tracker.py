@@ -1,119 +1,255 @@
+import argparse
 import cv2
 import mediapipe as mp
-import math
 from datetime import datetime
+import json
 import os
+import time
+
+from adaptive import AdaptiveScheduler, landmark_box, map_landmarks, region_frame_size
+from features import extract_features, landmark_array
+from pipeline import DROP_POLICIES, FramePipeline, open_source
+from timing import StageTimer, timed
 
 # Initialize Mediapipe
 mp_face_mesh = mp.solutions.face_mesh
 
-# Create recordings folder if not exists
-if not os.path.exists("recordings"):
-    os.makedirs("recordings")
-
-# Generate unique filename with timestamp
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-output_path = f"recordings/session_{timestamp}.mp4"
+WINDOW_NAME = "📹 Proctoring - Face & Eye Tracker"
 
 # Helper functions
-def calculate_head_movement(landmarks):
-    left_eye = landmarks[133]
-    right_eye = landmarks[362]
-    dx = right_eye.x - left_eye.x
-    dy = right_eye.y - left_eye.y
-    angle = math.degrees(math.atan2(dy, dx))
-    return angle
-
-def detect_eye_movement(landmarks):
-    left_iris_y = landmarks[159].y
-    left_iris_lower_y = landmarks[145].y
-    return left_iris_lower_y - left_iris_y
-
-# Start webcam
-cap = cv2.VideoCapture(0)
-
-# Get resolution
-frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-# Configure writer (macOS compatible codec)
-fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-out = cv2.VideoWriter(output_path, fourcc, 20.0, (frame_width, frame_height))
-
-print(f"[INFO] Recording session started. Saving to: {output_path}")
-
-with mp_face_mesh.FaceMesh(static_image_mode=False,
-                           max_num_faces=1,
-                           refine_landmarks=True,
-                           min_detection_confidence=0.7,
-                           min_tracking_confidence=0.7) as face_mesh:
-
-    while cap.isOpened():
-        success, frame = cap.read()
+def create_face_mesh(static_image_mode=False):
+    return mp_face_mesh.FaceMesh(static_image_mode=static_image_mode,
+                                 max_num_faces=1,
+                                 refine_landmarks=True,
+                                 min_detection_confidence=0.7,
+                                 min_tracking_confidence=0.7)
+
+def detect_faces(face_mesh, image, timer=None):
+    # Raw landmark lists per detected face, normalized to `image`
+    with timed(timer, "convert"):
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    with timed(timer, "inference"):
+        result = face_mesh.process(rgb_image)
+    return result.multi_face_landmarks or []
+
+def describe_face(metrics):
+    # Head angle
+    angle = metrics["angle"]
+    if angle > 15:
+        direction = "Looking Right"
+        warning = "⚠️ Turned Right - Stay Focused"
+        color = (0, 0, 255)
+    elif angle < -15:
+        direction = "Looking Left"
+        warning = "⚠️ Turned Left - Stay Focused"
+        color = (0, 0, 255)
+    elif 5 < angle <= 15 or -15 <= angle < -5:
+        direction = "Slight Head Movement"
+        warning = "⚠️ Suspicious Slight Movement"
+        color = (0, 165, 255)
+    else:
+        direction = "Looking Center"
+        warning = ""
+        color = (0, 255, 0)
+
+    # Eye state
+    if metrics["eye_openness"] < 0.01:
+        eye_status = "⚠️ Eyes Closed / Down"
+    else:
+        eye_status = "Eyes Open"
+
+    return {**metrics, "direction": direction, "warning": warning, "color": color,
+            "eye_status": eye_status}
+
+def analyze_frame(face_mesh, frame, timer=None):
+    # Returns one analysis per detected face (empty when no face is found)
+    faces = detect_faces(face_mesh, frame, timer)
+    with timed(timer, "features"):
+        size = (frame.shape[1], frame.shape[0])
+        return [describe_face(extract_features(landmark_array(face.landmark), size)) for face in faces]
+
+# Adaptive mode: the scheduler picks full frame, face crop or skip for every frame
+def create_scheduler(face_mesh, target_fps=10.0, cpu_budget=None, scale=0.5, timer=None):
+    def infer(image, region):
+        faces = detect_faces(face_mesh, image, timer)
+        if not faces:
+            return None, {}, None
+        with timed(timer, "features"):
+            points = map_landmarks(landmark_array(faces[0].landmark), region)
+            return points, extract_features(points, region_frame_size(image, region)), landmark_box(points)
+
+    return AdaptiveScheduler(infer, target_fps=target_fps, cpu_budget=cpu_budget, scale=scale,
+                             stable_keys=("angle", "yaw", "pitch"), stable_delta=2.0)
+
+def analyze_adaptive(scheduler, frame):
+    _, metrics, _ = scheduler.step(frame)
+    return [describe_face(metrics)] if metrics else []
+
+def draw_analysis(frame, faces):
+    if faces is None:
+        # Pipelined mode before the first inference result arrives
+        return
+    if not faces:
+        cv2.putText(frame, "❌ No Face Detected", (20, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+    for face in faces:
+        # Display data
+        cv2.putText(frame, f"Head Angle: {face['angle']:.2f}", (20, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, face["color"], 2)
+        cv2.putText(frame, face["direction"], (20, 60),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, face["color"], 2)
+        cv2.putText(frame, face["eye_status"], (20, 90),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 165, 0), 2)
+
+        cv2.putText(frame, f"Yaw {face['yaw']:.0f}  Pitch {face['pitch']:.0f}  "
+                           f"Gaze {face['gaze_x']:+.2f}  Mouth {face['mouth_open']:.2f}", (20, 120),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 165, 0), 2)
+
+        if face["warning"]:
+            cv2.putText(frame, face["warning"], (20, 150),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+
+def draw_timing(frame, timer, stages=("capture", "inference", "features", "draw", "encode")):
+    # FPS and rolling p50 / p95 per stage in the bottom-left corner
+    report = timer.percentiles((50, 95))
+    lines = [f"FPS {timer.fps():.1f}"]
+    if "frame" in report:
+        lines[0] += f"  frame p50 {report['frame']['p50_ms']:.1f} / p95 {report['frame']['p95_ms']:.1f} ms"
+    lines += [f"{stage} {report[stage]['p50_ms']:.1f} / {report[stage]['p95_ms']:.1f} ms"
+              for stage in stages if stage in report]
+    bottom = frame.shape[0] - 10
+    for row, line in enumerate(reversed(lines)):
+        cv2.putText(frame, line, (10, bottom - 18 * row), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+def print_timing(timer):
+    print(f"[INFO] Average {timer.fps():.1f} FPS over the last {timer.window} frames")
+    for stage, stats in timer.percentiles().items():
+        print(f"[INFO]   {stage:<10} " + "  ".join(f"{name} {value:.2f}" for name, value in stats.items()))
+
+# Serial loop: read, infer, draw, show and write one frame at a time
+def run_serial(source, out, analyze, display=True, timer=None, overlay=True):
+    while source.is_opened():
+        started = time.perf_counter()
+        with timed(timer, "capture"):
+            success, frame = source.read()
         if not success:
-            print("[ERROR] Cannot access webcam.")
+            print(f"[INFO] No more frames from {source.name}.")
             break
 
-        frame = cv2.flip(frame, 1)
-        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result = face_mesh.process(rgb_image)
+        faces = analyze(frame)
+        with timed(timer, "draw"):
+            draw_analysis(frame, faces)
+            if overlay and timer is not None:
+                draw_timing(frame, timer)
 
-        if result.multi_face_landmarks:
-            for face_landmarks in result.multi_face_landmarks:
-                landmarks = face_landmarks.landmark
-
-                # Head angle
-                angle = calculate_head_movement(landmarks)
-                if angle > 15:
-                    direction = "Looking Right"
-                    warning = "⚠️ Turned Right - Stay Focused"
-                    color = (0, 0, 255)
-                elif angle < -15:
-                    direction = "Looking Left"
-                    warning = "⚠️ Turned Left - Stay Focused"
-                    color = (0, 0, 255)
-                elif 5 < angle <= 15 or -15 <= angle < -5:
-                    direction = "Slight Head Movement"
-                    warning = "⚠️ Suspicious Slight Movement"
-                    color = (0, 165, 255)
-                else:
-                    direction = "Looking Center"
-                    warning = ""
-                    color = (0, 255, 0)
-
-                # Eye state
-                eye_movement = detect_eye_movement(landmarks)
-                if eye_movement < 0.01:
-                    eye_status = "⚠️ Eyes Closed / Down"
-                else:
-                    eye_status = "Eyes Open"
-
-                # Display data
-                cv2.putText(frame, f"Head Angle: {angle:.2f}", (20, 30),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-                cv2.putText(frame, direction, (20, 60),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-                cv2.putText(frame, eye_status, (20, 90),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 165, 0), 2)
-
-                if warning:
-                    cv2.putText(frame, warning, (20, 120),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        # Show and record
+        with timed(timer, "encode"):
+            out.write(frame)
+        if timer is not None:
+            timer.record("frame", time.perf_counter() - started)
+            timer.tick()
+        if display:
+            with timed(timer, "display"):
+                cv2.imshow(WINDOW_NAME, frame)
+                key = cv2.waitKey(5)
+            if key & 0xFF == ord('q'):
+                print("[INFO] Session ended.")
+                break
+
+# Pipelined loop: capture, inference and encoding run on their own threads
+def run_pipelined(source, out, analyze, policy="latest", queue_size=8, display=True, timer=None, overlay=True):
+    def annotate(frame, faces):
+        draw_analysis(frame, faces)
+        if overlay and timer is not None:
+            draw_timing(frame, timer)
+
+    pipeline = FramePipeline(source, analyze, annotate, writer=out, policy=policy,
+                             queue_size=queue_size, timer=timer).start()
+    # GUI calls stay on the main thread
+    for frame in pipeline.frames():
+        if display:
+            with timed(timer, "display"):
+                cv2.imshow(WINDOW_NAME, frame)
+                key = cv2.waitKey(1)
+            if key & 0xFF == ord('q'):
+                print("[INFO] Session ended.")
+                pipeline.stop()
+    pipeline.join()
+
+    stats = pipeline.summary()
+    print(f"[INFO] Captured {stats['captured']} frames, wrote {stats['written']}, "
+          f"inferred {stats['inferred']} ({stats['inference_dropped']} skipped by the '{policy}' policy)")
+    print(f"[INFO] Capture {stats['capture_fps']:.1f} FPS, inference {stats['inference_fps']:.1f} FPS")
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a proctoring session with face and eye tracking.")
+    parser.add_argument("--source", default="0", help="webcam index or path to a video file")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="run capture, inference and encoding on separate threads")
+    parser.add_argument("--drop-policy", choices=DROP_POLICIES, default="latest",
+                        help="latest: infer on the newest frame only; every: infer on every frame")
+    parser.add_argument("--queue-size", type=int, default=8)
+    parser.add_argument("--no-display", action="store_true")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="downscale, crop around the face and skip frames while the head is still")
+    parser.add_argument("--target-fps", type=float, default=10.0, help="adaptive: max inferences per second")
+    parser.add_argument("--cpu-budget", type=float, default=None,
+                        help="adaptive: fraction of one core inference may use, e.g. 0.25")
+    parser.add_argument("--scale", type=float, default=0.5, help="adaptive: full-frame downscale factor")
+    parser.add_argument("--no-overlay", action="store_true", help="hide the FPS / latency overlay")
+    parser.add_argument("--timing-window", type=int, default=300, help="frames kept for rolling percentiles")
+    parser.add_argument("--timing-json", default=None, help="write the final per-stage percentiles here")
+    args = parser.parse_args()
+
+    # Create recordings folder if not exists
+    if not os.path.exists("recordings"):
+        os.makedirs("recordings")
+
+    # Generate unique filename with timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_path = f"recordings/session_{timestamp}.mp4"
+
+    source = open_source(args.source)
+    if not source.is_opened():
+        print(f"[ERROR] Cannot open video source {source.name}.")
+        return
+
+    # Configure writer (macOS compatible codec)
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(output_path, fourcc, source.fps, source.size)
+
+    print(f"[INFO] Recording session started. Saving to: {output_path}")
+
+    # Adaptive inputs jump between crops and scales, so every call detects afresh
+    timer = StageTimer(args.timing_window)
+    with create_face_mesh(static_image_mode=args.adaptive) as face_mesh:
+        scheduler = None
+        if args.adaptive:
+            scheduler = create_scheduler(face_mesh, args.target_fps, args.cpu_budget, args.scale, timer)
+            analyze = lambda frame: analyze_adaptive(scheduler, frame)
         else:
-            cv2.putText(frame, "❌ No Face Detected", (20, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+            analyze = lambda frame: analyze_frame(face_mesh, frame, timer)
 
-        # Show and record
-        cv2.imshow("📹 Proctoring - Face & Eye Tracker", frame)
-        out.write(frame)
+        overlay = not args.no_overlay
+        if args.pipelined:
+            run_pipelined(source, out, analyze, args.drop_policy, args.queue_size, not args.no_display,
+                          timer, overlay)
+        else:
+            run_serial(source, out, analyze, not args.no_display, timer, overlay)
 
-        if cv2.waitKey(5) & 0xFF == ord('q'):
-            print("[INFO] Session ended.")
-            break
+    if scheduler is not None:
+        print("[INFO] Adaptive inference: " + ", ".join(f"{mode}={count}" for mode, count in scheduler.counts.items()))
+    print_timing(timer)
+    if args.timing_json:
+        with open(args.timing_json, "w") as handle:
+            json.dump({"fps": round(timer.fps(), 2), "stages": timer.percentiles()}, handle, indent=2)
+
+    # Clean up
+    source.release()
+    out.release()
+    cv2.destroyAllWindows()
 
-# Clean up
-cap.release()
-out.release()
-cv2.destroyAllWindows()
+    print(f"[INFO] Video saved at: {output_path}")
 
-print(f"[INFO] Video saved at: {output_path}")
+if __name__ == "__main__":
+    main()
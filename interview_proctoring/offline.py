@@ -0,0 +1,240 @@
+import argparse
+import csv
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+import cv2
+import numpy as np
+
+from features import FEATURE_NAMES, extract_features, landmark_array
+from pipeline import VideoFileSource
+
+CHUNK_FRAMES = 1800  # ~1.5 min at 20 FPS per task, so long sessions spread over workers
+SUMMARY_NAME = "summary.csv"
+
+# Warning bit flags of the per-frame `warnings` column
+WARN_NO_FACE = 1
+WARN_SLIGHT = 2
+WARN_LEFT = 4
+WARN_RIGHT = 8
+WARN_EYES = 16
+WARNING_NAMES = {WARN_NO_FACE: "no_face", WARN_SLIGHT: "slight_movement", WARN_LEFT: "turned_left",
+                 WARN_RIGHT: "turned_right", WARN_EYES: "eyes_closed"}
+DIRECTION_FLAGS = {"Looking Right": WARN_RIGHT, "Looking Left": WARN_LEFT, "Slight Head Movement": WARN_SLIGHT}
+
+# One FaceMesh per worker process, created by the pool initializer
+_worker = {}
+
+
+# Worker side
+def _init_worker(stride):
+    from mediapipe_face_tracker import create_face_mesh
+    # Parallelism comes from the pool; keep OpenCV from spawning threads in every worker
+    cv2.setNumThreads(1)
+    # Strided frames are too far apart for tracking, so every sample is detected afresh
+    _worker["static"] = stride > 1
+    _worker["face_mesh"] = create_face_mesh(static_image_mode=_worker["static"])
+    _worker["used"] = False
+
+
+def _chunk_face_mesh():
+    # Tracking state must not carry over from the previous chunk, which may be another session
+    from mediapipe_face_tracker import create_face_mesh
+
+    if _worker["used"] and not _worker["static"]:
+        _worker["face_mesh"].close()
+        _worker["face_mesh"] = create_face_mesh()
+    _worker["used"] = True
+    return _worker["face_mesh"]
+
+
+def analyze_chunk(path, start, stop, stride=1):
+    """Per-frame columns for frames [start, stop) of one recording; stop None reads to the end."""
+    from mediapipe_face_tracker import describe_face
+
+    source = VideoFileSource(path)
+    if not source.is_opened():
+        raise IOError(f"cannot open {path}")
+    face_mesh = _chunk_face_mesh()
+    if start:
+        source.capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+    fps = source.fps
+    frames, warnings = [], []
+    features = {name: [] for name in FEATURE_NAMES}
+    index = start
+    while stop is None or index < stop:
+        # grab() skips decoding of the frames between strided samples
+        if (index - start) % stride:
+            if not source.capture.grab():
+                break
+            index += 1
+            continue
+        success, frame = source.read()
+        if not success:
+            break
+        result = face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        frames.append(index)
+        if result.multi_face_landmarks:
+            points = landmark_array(result.multi_face_landmarks[0].landmark)
+            face = describe_face(extract_features(points, (frame.shape[1], frame.shape[0])))
+            for name, values in features.items():
+                values.append(face[name])
+            flags = DIRECTION_FLAGS.get(face["direction"], 0)
+            if face["eye_status"] != "Eyes Open":
+                flags |= WARN_EYES
+            warnings.append(flags)
+        else:
+            for values in features.values():
+                values.append(np.nan)
+            warnings.append(WARN_NO_FACE)
+        index += 1
+    source.release()
+
+    frames = np.asarray(frames, dtype=np.int32)
+    return {"frame": frames, "time": (frames / fps).astype(np.float32),
+            "face": np.asarray(warnings, dtype=np.uint8) != WARN_NO_FACE,
+            **{name: np.asarray(values, dtype=np.float32) for name, values in features.items()},
+            "warnings": np.asarray(warnings, dtype=np.uint8)}, fps
+
+
+# Parent side
+def session_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def plan_chunks(path, chunk_frames=CHUNK_FRAMES):
+    """[(start, stop)] frame ranges; a single open-ended chunk when the container has no frame count."""
+    source = VideoFileSource(path)
+    if not source.is_opened():
+        raise IOError(f"cannot open {path}")
+    total = int(source.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    source.release()
+    if total <= 0:
+        return [(0, None)]
+    return [(start, min(start + chunk_frames, total)) for start in range(0, total, chunk_frames)]
+
+
+def longest_run(mask):
+    # Length of the longest run of True values
+    if not mask.any():
+        return 0
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return int((edges[1::2] - edges[::2]).max())
+
+
+def summarize_session(name, columns, fps, stride=1):
+    n = len(columns["frame"])
+    face = columns["face"]
+    summary = {"session": name, "frames": n, "duration_s": round(n * stride / fps, 2),
+               "face_present": round(float(face.mean()) if n else 0.0, 4),
+               "mean_abs_angle": round(float(np.abs(columns["angle"][face]).mean()) if face.any() else 0.0, 2),
+               "longest_no_face_s": round(longest_run(~face) * stride / fps, 2)}
+    for flag, warning in WARNING_NAMES.items():
+        summary[f"{warning}_s"] = round(float(np.count_nonzero(columns["warnings"] & flag)) * stride / fps, 2)
+    return summary
+
+
+def save_events(path, columns, fps):
+    np.savez_compressed(path, fps=np.float32(fps), **columns)
+
+
+def load_events(path):
+    with np.load(path) as events:
+        return {name: events[name] for name in events.files}
+
+
+def analyze_recordings(paths, output_dir, workers=None, chunk_frames=CHUNK_FRAMES, stride=1, overwrite=False):
+    """Analyse recordings across a process pool; writes <session>.npz event logs and returns their summaries."""
+    os.makedirs(output_dir, exist_ok=True)
+    todo = [path for path in paths
+            if overwrite or not os.path.exists(os.path.join(output_dir, session_name(path) + ".npz"))]
+    if len(todo) < len(paths):
+        print(f"[INFO] Skipping {len(paths) - len(todo)} sessions already analysed (use --overwrite to redo).")
+
+    # Chunk boundaries on a stride multiple keep the sampled frames evenly spaced
+    chunk_frames = -(-chunk_frames // stride) * stride
+    plans = {}
+    for path in todo:
+        try:
+            plans[path] = plan_chunks(path, chunk_frames)
+        except IOError as error:
+            # No event log is written, so a later run retries the session
+            print(f"[ERROR] {session_name(path)}: {error}")
+    pending = {path: {} for path in plans}
+    summaries = []
+    # Spawned workers do not inherit the parent's OpenCV / MediaPipe state
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                             initializer=_init_worker, initargs=(stride,)) as pool:
+        futures = {pool.submit(analyze_chunk, path, start, stop, stride): (path, start)
+                   for path, chunks in plans.items() for start, stop in chunks}
+        for future in as_completed(futures):
+            path, start = futures[future]
+            try:
+                pending[path][start] = future.result()
+            except Exception as error:
+                print(f"[ERROR] {session_name(path)} frames from {start}: {error}")
+                pending[path][start] = None
+            if len(pending[path]) < len(plans[path]):
+                continue
+
+            # Session complete: stitch its chunks in frame order and free them
+            chunks = pending.pop(path)
+            if any(chunk is None for chunk in chunks.values()):
+                print(f"[ERROR] {session_name(path)} incomplete, no event log written.")
+                continue
+            parts = [chunks[start] for start in sorted(chunks)]
+            fps = parts[0][1]
+            columns = {name: np.concatenate([columns[name] for columns, _ in parts]) for name in parts[0][0]}
+            if not len(columns["frame"]):
+                print(f"[ERROR] {session_name(path)}: no frames could be decoded, no event log written.")
+                continue
+            save_events(os.path.join(output_dir, session_name(path) + ".npz"), columns, fps)
+            summaries.append(summarize_session(session_name(path), columns, fps, stride))
+            print(f"[INFO] {session_name(path)}: {len(columns['frame'])} frames analysed.")
+    return summaries
+
+
+def write_summaries(summaries, path):
+    """Merge session rows into the summary CSV; re-analysed sessions replace their old row."""
+    if not summaries:
+        return
+    rows = {}
+    if os.path.exists(path):
+        with open(path, newline="") as handle:
+            rows = {row["session"]: row for row in csv.DictReader(handle)}
+    rows.update((summary["session"], summary) for summary in summaries)
+    with open(path, "w", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=list(summaries[0]))
+        writer.writeheader()
+        writer.writerows(rows[name] for name in sorted(rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse recorded proctoring sessions offline, without overlays.")
+    parser.add_argument("--input", default="recordings", help="directory of session recordings")
+    parser.add_argument("--pattern", default="session_*.mp4")
+    parser.add_argument("--output", default="analysis", help="directory for event logs and summary.csv")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-frames", type=int, default=CHUNK_FRAMES)
+    parser.add_argument("--stride", type=int, default=1, help="analyse every n-th frame")
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.input, args.pattern)))
+    if not paths:
+        print(f"[ERROR] No recordings matching {args.pattern} in {args.input}.")
+        return
+
+    print(f"[INFO] Analysing {len(paths)} recordings with {args.workers or os.cpu_count()} workers...")
+    start = time.perf_counter()
+    summaries = analyze_recordings(paths, args.output, args.workers, args.chunk_frames, args.stride, args.overwrite)
+    write_summaries(summaries, os.path.join(args.output, SUMMARY_NAME))
+    print(f"[INFO] {len(summaries)} sessions done in {time.perf_counter() - start:.1f}s. "
+          f"Summaries in {os.path.join(args.output, SUMMARY_NAME)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import queue
+import threading
+import time
+
+import cv2
+
+from timing import timed
+
+DROP_POLICIES = ("latest", "every")
+_STOP = object()
+
+
+# Video sources
+class VideoSource:
+    """Anything with read() -> (ok, frame), fps, size and release() can feed the pipeline."""
+
+    def __init__(self, capture, name, flip=False):
+        self.capture = capture
+        self.name = name
+        self.flip = flip
+
+    @property
+    def fps(self):
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        return fps if fps and fps > 0 else 20.0
+
+    @property
+    def size(self):
+        return (int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def is_opened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        success, frame = self.capture.read()
+        if success and self.flip:
+            frame = cv2.flip(frame, 1)
+        return success, frame
+
+    def release(self):
+        self.capture.release()
+
+
+class WebcamSource(VideoSource):
+    def __init__(self, index=0):
+        # Mirrored so the preview behaves like a mirror for the candidate
+        super().__init__(cv2.VideoCapture(index), f"webcam:{index}", flip=True)
+
+
+class VideoFileSource(VideoSource):
+    def __init__(self, path):
+        super().__init__(cv2.VideoCapture(path), path, flip=False)
+
+
+def open_source(spec):
+    """A webcam for an integer (or digit string) spec, otherwise a video file path."""
+    if isinstance(spec, int) or str(spec).isdigit():
+        return WebcamSource(int(spec))
+    return VideoFileSource(str(spec))
+
+
+# Queues
+class FrameQueue:
+    """Bounded queue between two stages.
+
+    "every" blocks the producer when full, so no frame is lost (backpressure).
+    "latest" never blocks: a full queue drops its oldest frame, so the consumer
+    always gets the freshest one.
+    """
+
+    def __init__(self, maxsize=8, policy="every"):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {policy!r}, expected one of {DROP_POLICIES}")
+        self.policy = policy
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, item):
+        if self.policy == "every":
+            self.queue.put(item)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        return self.queue.get(timeout=timeout)
+
+    def close(self):
+        self.put(_STOP)
+
+
+# Pipeline
+class FramePipeline:
+    """Capture, inference and encoding on separate threads.
+
+    latest: capture feeds the encoder every frame and the inference stage only
+            the freshest one; frames are annotated with the most recent result,
+            so the recording keeps the source frame rate when inference is slow.
+    every:  every frame goes through inference before it is encoded; bounded
+            queues push back on capture instead of dropping (offline files).
+
+    `infer(frame) -> result` runs on the inference thread, `annotate(frame,
+    result)` and `writer.write` on the encoder thread. Annotated frames for
+    display are offered through `display` (latest-frame queue). With a `timer`
+    (timing.StageTimer) capture, draw and encode are timed, plus "frame" from
+    capture to encoded.
+    """
+
+    def __init__(self, source, infer, annotate, writer=None, policy="latest", queue_size=8, timer=None):
+        self.source = source
+        self.infer = infer
+        self.annotate = annotate
+        self.writer = writer
+        self.policy = policy
+        self.timer = timer
+        self.inference_queue = FrameQueue(1 if policy == "latest" else queue_size, policy)
+        self.encode_queue = FrameQueue(queue_size, "every")
+        self.display = FrameQueue(1, "latest")
+        self.stats = dict.fromkeys(["captured", "inferred", "written"], 0)
+        self._latest = None
+        self._latest_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=target, name=name, daemon=True)
+                         for name, target in (("capture", self._capture), ("inference", self._inference),
+                                              ("encoder", self._encoder))]
+
+    def start(self):
+        self.started = time.perf_counter()
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def frames(self, timeout=0.1):
+        """Annotated frames for display on the calling (main) thread, until encoding ends."""
+        while True:
+            try:
+                item = self.display.get(timeout=timeout)
+            except queue.Empty:
+                if not self.running():
+                    return
+                continue
+            if item is _STOP:
+                return
+            yield item
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {**self.stats, "inference_dropped": self.inference_queue.dropped,
+                "capture_fps": self.stats["captured"] / elapsed, "inference_fps": self.stats["inferred"] / elapsed}
+
+    # Stages
+    def _capture(self):
+        index = 0
+        while not self._stop.is_set() and self.source.is_opened():
+            with timed(self.timer, "capture"):
+                success, frame = self.source.read()
+            if not success:
+                break
+            item = (index, time.perf_counter(), frame)
+            if self.policy == "latest":
+                # The encoder draws on its frame while inference may still be reading this one
+                self.inference_queue.put((index, item[1], frame.copy()))
+                self.encode_queue.put(item)
+            else:
+                self.inference_queue.put(item)
+            self.stats["captured"] += 1
+            index += 1
+        self.inference_queue.close()
+        if self.policy == "latest":
+            self.encode_queue.close()
+
+    def _inference(self):
+        while True:
+            item = self.inference_queue.get()
+            if item is _STOP:
+                break
+            index, captured_at, frame = item
+            result = self.infer(frame)
+            self.stats["inferred"] += 1
+            with self._latest_lock:
+                self._latest = result
+            if self.policy == "every":
+                self.encode_queue.put((index, captured_at, frame, result))
+        if self.policy == "every":
+            self.encode_queue.close()
+
+    def _encoder(self):
+        while True:
+            item = self.encode_queue.get()
+            if item is _STOP:
+                break
+            if self.policy == "every":
+                _, captured_at, frame, result = item
+            else:
+                _, captured_at, frame = item
+                with self._latest_lock:
+                    result = self._latest
+            with timed(self.timer, "draw"):
+                self.annotate(frame, result)
+            if self.writer is not None:
+                with timed(self.timer, "encode"):
+                    self.writer.write(frame)
+            self.stats["written"] += 1
+            if self.timer is not None:
+                self.timer.record("frame", time.perf_counter() - captured_at)
+                self.timer.tick()
+            self.display.put(frame)
+        self.display.close()
@@ -0,0 +1,62 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+STAGES = ("capture", "convert", "inference", "features", "draw", "encode", "display", "frame")
+
+
+class StageTimer:
+    """Rolling latencies of the per-frame stages over the last `window` samples each.
+
+    Stages are timed with `with timer.stage("inference"): ...` or `record`,
+    from any thread. "frame" is the end-to-end time from capture to encoding and
+    `tick()` marks each finished frame for the FPS estimate.
+    """
+
+    def __init__(self, window=300):
+        self.window = window
+        self.samples = {stage: deque(maxlen=window) for stage in STAGES}
+        self.ticks = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        samples = self.samples.get(name)
+        if samples is None:
+            with self._lock:
+                samples = self.samples.setdefault(name, deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def tick(self):
+        self.ticks.append(time.perf_counter())
+
+    def fps(self):
+        ticks = list(self.ticks)
+        if len(ticks) < 2 or ticks[-1] <= ticks[0]:
+            return 0.0
+        return (len(ticks) - 1) / (ticks[-1] - ticks[0])
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        """{stage: {"p50_ms": ..., ...}} for the stages with samples in the window."""
+        report = {}
+        for stage, samples in list(self.samples.items()):
+            samples = list(samples)
+            if samples:
+                values = np.percentile(np.asarray(samples) * 1000, quantiles)
+                report[stage] = {f"p{q}_ms": round(float(value), 3) for q, value in zip(quantiles, values)}
+        return report
+
+
+def timed(timer, name):
+    # Stage context that is a no-op without a timer
+    return timer.stage(name) if timer is not None else nullcontext()
@@ -0,0 +1,208 @@
+"""
+Request micro-batching for the recommendation endpoint.
+
+Concurrent requests for the same model are queued for at most
+RECOMMENDATION_BATCH_WINDOW_MS (or until RECOMMENDATION_MAX_BATCH requests are
+waiting) and then scored together with one matrix product against the model's
+in-memory factors, instead of one matrix-vector product per request.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from django.conf import settings
+
+from model_registry import FACTOR_NAMES, interactions_from, latest_version, load
+from scoring import score_block, top_k_rows
+
+
+class UnknownUser(LookupError):
+    pass
+
+
+# ----------------- Metrics -----------------
+class BatchMetrics:
+    """Rolling request latency and batch-size statistics."""
+
+    def __init__(self, window=10_000):
+        self._lock = threading.Lock()
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.batches = 0
+
+    def record_batch(self, size):
+        with self._lock:
+            self.batches += 1
+            self.batch_sizes.append(size)
+
+    def record_request(self, latency_ms):
+        with self._lock:
+            self.requests += 1
+            self.latencies_ms.append(latency_ms)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = np.asarray(self.latencies_ms)
+            sizes = np.asarray(self.batch_sizes)
+            requests, batches = self.requests, self.batches
+        summary = {'requests': requests, 'batches': batches}
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            summary['latency_ms'] = {'p50': p50, 'p95': p95, 'p99': p99, 'max': latencies.max()}
+        if len(sizes):
+            summary['batch_size'] = {'mean': sizes.mean(), 'max': int(sizes.max())}
+        return summary
+
+
+# ----------------- Models -----------------
+class ServingModel:
+    """Factors of one published model version plus the interactions it was fit on, for filtering."""
+
+    def __init__(self, name, version=None):
+        arrays, self.meta = load(name, version, mmap=False)
+        self.factors = tuple(arrays.get(key) for key in FACTOR_NAMES)
+        # Same version's matrix, so users added by a fold-in have rows too
+        self.train = interactions_from(arrays, self.meta)
+        self.version = self.meta['version']
+        self.n_users = self.factors[0].shape[0]
+
+    def score(self, requests):
+        # requests: list of (user, n, exclusions, exclude_seen)
+        user_vectors, item_vectors, user_biases, item_biases = self.factors
+        users = np.array([user for user, _, _, _ in requests], dtype=np.int64)
+        scores = score_block(user_vectors, item_vectors, users, user_biases, item_biases)
+
+        rows, cols = [], []
+        for row, (user, _, exclusions, exclude_seen) in enumerate(requests):
+            exclusions = np.asarray(exclusions, dtype=np.int64)
+            exclusions = exclusions[(exclusions >= 0) & (exclusions < scores.shape[1])]
+            seen = self.train.indices[self.train.indptr[user]:self.train.indptr[user + 1]] if exclude_seen else []
+            for items in (seen, exclusions):
+                rows.append(np.full(len(items), row))
+                cols.append(np.asarray(items, dtype=np.int64))
+        scores[np.concatenate(rows), np.concatenate(cols)] = -np.inf
+
+        k = min(max(n for _, n, _, _ in requests), scores.shape[1])
+        ids, top_scores = top_k_rows(scores, k)
+        results = []
+        for row, (_, n, _, _) in enumerate(requests):
+            valid = np.isfinite(top_scores[row, :n])
+            results.append((ids[row, :n][valid], top_scores[row, :n][valid]))
+        return results
+
+
+_models = {}
+_models_lock = threading.Lock()
+_version_checks = {}
+
+
+def current_version(name):
+    # LATEST is re-read at most every RECOMMENDATION_VERSION_CHECK_SECONDS
+    ttl = getattr(settings, 'RECOMMENDATION_VERSION_CHECK_SECONDS', 1.0)
+    now = time.monotonic()
+    checked = _version_checks.get(name)
+    if checked is None or now - checked[0] >= ttl:
+        checked = _version_checks[name] = (now, latest_version(name))
+    return checked[1]
+
+
+def get_model(name):
+    """ServingModel of the latest published version; a new version replaces the loaded one."""
+    version = current_version(name)
+    with _models_lock:
+        model = _models.get(name)
+        if model is None or model.version != version:
+            model = _models[name] = ServingModel(name, version)
+        return model
+
+
+# ----------------- Batcher -----------------
+class MicroBatcher:
+    def __init__(self, model_name, metrics, window_ms, max_batch):
+        self.model_name = model_name
+        self.metrics = metrics
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def recommend(self, user, n, exclusions=(), exclude_seen=True):
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(((user, n, list(exclusions), exclude_seen), future))
+        try:
+            return await future
+        finally:
+            self.metrics.record_request((time.perf_counter() - start) * 1000)
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            requests = [request for request, _ in batch]
+            self.metrics.record_batch(len(batch))
+            try:
+                # The product runs off the event loop so new requests keep queueing
+                results = await loop.run_in_executor(None, self._score, requests)
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _score(self, requests):
+        # Unknown users fail on their own instead of failing the whole batch
+        model = get_model(self.model_name)
+        known = [i for i, (user, _, _, _) in enumerate(requests) if 0 <= user < model.n_users]
+        results = [UnknownUser(user) for user, _, _, _ in requests]
+        if known:
+            for i, (ids, scores) in zip(known, model.score([requests[i] for i in known])):
+                # The version scored with, which may be newer than the one the view looked up
+                results[i] = (ids, scores, model.version)
+        return results
+
+
+metrics = BatchMetrics()
+# One batcher per model and event loop: queues and futures are bound to their loop.
+# Under ASGI there is one long-lived loop per worker; WSGI runs each async view in
+# its own short-lived loop, so batchers of closed loops are dropped here.
+_batchers = {}
+
+
+def get_batcher(model_name):
+    loop = asyncio.get_running_loop()
+    for closed in [key for key in _batchers if key.is_closed()]:
+        del _batchers[closed]
+    batchers = _batchers.setdefault(loop, {})
+    if model_name not in batchers:
+        batchers[model_name] = MicroBatcher(
+            model_name, metrics,
+            window_ms=getattr(settings, 'RECOMMENDATION_BATCH_WINDOW_MS', 2),
+            max_batch=getattr(settings, 'RECOMMENDATION_MAX_BATCH', 256),
+        )
+    return batchers[model_name]
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'recommendations'
+
+urlpatterns = [
+    path('', views.recommend, name='recommend'),
+    path('metrics/', views.metrics_view, name='metrics'),
+]
@@ -0,0 +1,80 @@
+import time
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from model_registry import ModelNotFound
+from result_cache import RecommendationCache
+
+from .batching import UnknownUser, get_batcher, get_model, metrics
+
+MODELS = ('ALS', 'LightFM')
+MAX_N = 500
+
+result_cache = RecommendationCache(
+    max_bytes=getattr(settings, 'RECOMMENDATION_CACHE_MAX_BYTES', 64 << 20),
+    ttl=getattr(settings, 'RECOMMENDATION_CACHE_TTL', None),
+    disk_dir=getattr(settings, 'RECOMMENDATION_CACHE_DIR', None),
+)
+
+
+def _parse_items(value):
+    return [int(item) for item in value.split(',') if item.strip()] if value else []
+
+
+@require_GET
+async def recommend(request):
+    """
+    GET /api/recommendations/?user=1&n=10&model=ALS&exclude=5,17&exclude_seen=1
+
+    Requests are coalesced by the model's micro-batcher and scored together.
+    """
+    start = time.perf_counter()
+    try:
+        user = int(request.GET['user'])
+        n = int(request.GET.get('n', 10))
+        exclusions = _parse_items(request.GET.get('exclude'))
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'user (int), n (int) and exclude (comma-separated ints) expected'},
+                            status=400)
+    model_name = request.GET.get('model', 'ALS')
+    if model_name not in MODELS:
+        return JsonResponse({'error': f'model must be one of {", ".join(MODELS)}'}, status=400)
+    if not 0 < n <= MAX_N:
+        return JsonResponse({'error': f'n must be between 1 and {MAX_N}'}, status=400)
+    exclude_seen = request.GET.get('exclude_seen', '1') not in ('0', 'false', 'False')
+
+    batcher = get_batcher(model_name)
+    try:
+        # Loads the factors on first use and whenever a new version is published; keep that off the event loop
+        version = (await sync_to_async(get_model, thread_sensitive=False)(model_name)).version
+        filters = (exclude_seen, *sorted(set(exclusions)))
+        cached = result_cache.get(model_name, version, user, n, filters)
+        if cached is not None:
+            items, scores = cached
+            # Batched requests are recorded by the batcher; hits count towards the same latencies
+            metrics.record_request((time.perf_counter() - start) * 1000)
+        else:
+            items, scores, version = await batcher.recommend(user, n, exclusions, exclude_seen)
+            result_cache.put(model_name, version, user, n, filters, (items, scores))
+    except UnknownUser:
+        return JsonResponse({'error': f'unknown user {user}'}, status=404)
+    except ModelNotFound:
+        # Nothing published yet (or the version vanished); retry once training has run
+        return JsonResponse({'error': f'no published version of {model_name} is available'}, status=503)
+
+    return JsonResponse({
+        'user': user,
+        'model': model_name,
+        'version': version,
+        'items': items.tolist(),
+        'scores': scores.tolist(),
+    })
+
+
+@require_GET
+def metrics_view(request):
+    return JsonResponse({**metrics.snapshot(), 'cache': result_cache.stats()})
@@ -0,0 +1,192 @@
+import argparse
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from scoring import top_k_scores
+
+
+# ----------------- MIPS Transform -----------------
+def with_biases(user_vectors, item_vectors, user_biases=None, item_biases=None):
+    # Fold item biases into the dot product: [u, 1] . [v, b_i]; user biases don't change the ranking.
+    # Indexes of biased models (LightFM) are built on the item side, queries get the trailing 1.
+    if item_biases is None:
+        return user_vectors, item_vectors
+    ones = np.ones((user_vectors.shape[0], 1), dtype=user_vectors.dtype)
+    return (np.hstack([user_vectors, ones]),
+            np.hstack([item_vectors, item_biases[:, None].astype(item_vectors.dtype)]))
+
+
+def mips_transform(item_vectors):
+    """Append sqrt(M^2 - |v|^2) so that L2 nearest neighbours of [q, 0] are the max inner products."""
+    norms = np.einsum("ij,ij->i", item_vectors, item_vectors)
+    max_norm = norms.max() if len(norms) else 0.0
+    extra = np.sqrt(np.maximum(max_norm - norms, 0.0))[:, None]
+    return np.hstack([item_vectors, extra.astype(item_vectors.dtype)])
+
+
+# ----------------- k-means -----------------
+def kmeans(points, n_clusters, n_iter=10, seed=None):
+    rng = np.random.default_rng(seed)
+    centroids = points[rng.choice(len(points), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = _nearest(points, centroids)
+        # One-hot assignment matrix turns the per-cluster sums into one sparse product
+        assign = csr_matrix((np.ones(len(points)), (labels, np.arange(len(points)))),
+                            shape=(n_clusters, len(points)))
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = assign @ points
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        centroids[empty] = points[rng.choice(len(points), empty.sum(), replace=False)]
+    return centroids
+
+
+def _nearest(points, centroids, n=1):
+    distances = (centroids * centroids).sum(axis=1) - 2.0 * points @ centroids.T
+    if n == 1:
+        return distances.argmin(axis=1)
+    return np.argpartition(distances, n - 1, axis=1)[:, :n]
+
+
+# ----------------- IVF Index -----------------
+class IVFIndex:
+    """Inverted-file index for maximum inner product search over item factors.
+
+    Items are clustered in the MIPS-transformed space; a query only scores the
+    items in its `nprobe` closest lists. Raising `nprobe` trades latency for
+    recall, up to exact search at nprobe == n_lists.
+    """
+
+    def __init__(self, item_vectors, centroids, list_indptr, list_items, nprobe=8):
+        self.item_vectors = item_vectors
+        self.centroids = centroids
+        self.list_indptr = list_indptr
+        self.list_items = list_items
+        self.nprobe = nprobe
+        self._centroid_norms = (centroids * centroids).sum(axis=1)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, item_vectors, n_lists=None, nprobe=8, n_iter=10, max_train_points=100_000,
+              seed=None):
+        item_vectors = np.ascontiguousarray(item_vectors, dtype=np.float32)
+        n_lists = n_lists or max(1, int(np.sqrt(len(item_vectors))))
+        transformed = mips_transform(item_vectors)
+
+        rng = np.random.default_rng(seed)
+        sample = transformed
+        if len(transformed) > max_train_points:
+            sample = transformed[rng.choice(len(transformed), max_train_points, replace=False)]
+        # k-means seeds its centroids with distinct sample points
+        n_lists = min(n_lists, len(sample))
+        centroids = kmeans(sample, n_lists, n_iter=n_iter, seed=seed)
+
+        labels = _nearest(transformed, centroids)
+        list_items = np.argsort(labels, kind="stable").astype(np.int32)
+        list_indptr = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_lists), out=list_indptr[1:])
+        return cls(item_vectors, centroids.astype(np.float32), list_indptr, list_items, nprobe)
+
+    def candidates(self, query, nprobe=None):
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        # |[q, 0] - c|^2 up to the constant |q|^2: the query has no extra coordinate
+        distances = self._centroid_norms - 2.0 * (self.centroids[:, :-1] @ query)
+        lists = np.argpartition(distances, nprobe - 1)[:nprobe] if nprobe < self.n_lists else range(self.n_lists)
+        return np.concatenate([self.list_items[self.list_indptr[i]:self.list_indptr[i + 1]] for i in lists])
+
+    def search(self, queries, k, nprobe=None, exclude=None, users=None):
+        """Approximate top-k item ids and scores for each row of `queries`.
+
+        `exclude` is a CSR of seen items indexed by `users` (defaults to row order).
+        """
+        queries = np.atleast_2d(queries)
+        users = np.arange(len(queries)) if users is None else np.asarray(users)
+        ids = np.full((len(queries), k), -1, dtype=np.int32)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+        for row, query in enumerate(queries):
+            candidates = self.candidates(query, nprobe)
+            if exclude is not None:
+                seen = exclude.indices[exclude.indptr[users[row]]:exclude.indptr[users[row] + 1]]
+                candidates = candidates[~np.isin(candidates, seen)]
+            if len(candidates) == 0:
+                continue
+            candidate_scores = self.item_vectors[candidates] @ query
+            top = min(k, len(candidates))
+            best = np.argpartition(-candidate_scores, top - 1)[:top]
+            best = best[np.argsort(-candidate_scores[best])]
+            ids[row, :top] = candidates[best]
+            scores[row, :top] = candidate_scores[best]
+        return ids, scores
+
+    # ----------------- Persistence -----------------
+    def to_arrays(self, prefix=""):
+        return {f"{prefix}item_vectors": self.item_vectors, f"{prefix}centroids": self.centroids,
+                f"{prefix}list_indptr": self.list_indptr, f"{prefix}list_items": self.list_items}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix="", nprobe=8):
+        return cls(arrays[f"{prefix}item_vectors"], arrays[f"{prefix}centroids"],
+                   arrays[f"{prefix}list_indptr"], arrays[f"{prefix}list_items"], nprobe)
+
+
+# ----------------- Benchmark -----------------
+def benchmark(index, user_vectors, users, k=10, nprobes=(1, 2, 4, 8, 16, 32), exclude=None):
+    """Recall@k against exact scoring and per-query latency for each nprobe setting."""
+    queries = user_vectors[users]
+    start = time.perf_counter()
+    exact, _ = top_k_scores(user_vectors, index.item_vectors, users, k, exclude=exclude)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(users)
+
+    rows = []
+    for nprobe in nprobes:
+        latencies = []
+        found = 0
+        for row, user in enumerate(users):
+            start = time.perf_counter()
+            ids, _ = index.search(queries[row], k, nprobe=nprobe, exclude=exclude, users=[user])
+            latencies.append((time.perf_counter() - start) * 1000)
+            found += len(np.intersect1d(ids[0][ids[0] >= 0], exact[row][exact[row] >= 0]))
+        rows.append({
+            "nprobe": nprobe,
+            f"recall@{k}": found / max((exact >= 0).sum(), 1),
+            "mean_ms": float(np.mean(latencies)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "exact_ms": exact_ms,
+        })
+    return rows
+
+
+def main():
+    from implicit.als import AlternatingLeastSquares
+
+    from dataset_cache import load_interactions
+    from scoring import als_factors
+
+    parser = argparse.ArgumentParser(description="Benchmark IVF recall/latency against exact ALS scoring.")
+    parser.add_argument("--data", default="u.data")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+
+    matrix = load_interactions(args.data).matrix
+    model = AlternatingLeastSquares(factors=50, iterations=20, regularization=0.01)
+    model.fit(matrix)
+    user_vectors, item_vectors, _, _ = als_factors(model)
+
+    index = IVFIndex.build(item_vectors, n_lists=args.n_lists, seed=0)
+    users = np.random.default_rng(0).choice(matrix.shape[0], min(args.users, matrix.shape[0]), replace=False)
+    print(f"\n⚡ IVF index: {len(item_vectors)} items, {index.n_lists} lists")
+    for row in benchmark(index, user_vectors, users, k=args.k, exclude=matrix):
+        print("  ".join(f"{key}={value:.4f}" if isinstance(value, float) else f"{key}={value}"
+                        for key, value in row.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,89 @@
 # app.py
 
+import os
+import time
+
+_app_start = time.perf_counter()
+
 import streamlit as st
-import numpy as np
-from lightfm import LightFM
-from lightfm.datasets import fetch_movielens
-from implicit.als import AlternatingLeastSquares
 
-import scipy.sparse as sp
+from backends import BACKENDS, PROFILE_IMPORTS, BackendUnavailable, get_backend, import_report, timed_import
 
 st.set_page_config(page_title="Movie Recommender", layout="centered")
 
 st.title("🎬 Movie Recommender System (ALS & LightFM)")
 
-@st.cache_data
-def load_data():
-    from sklearn.model_selection import train_test_split
-    data = fetch_movielens(min_rating=4.0)
-    return data['train'], data['test'], data['item_labels']
+# Users with fewer interactions than this get the demographic cold-start lists
+COLD_START_MIN_INTERACTIONS = 5
+
 @st.cache_resource
-def train_models(_train):
-    als_model = AlternatingLeastSquares(factors=20, regularization=0.1, iterations=20)
-    als_model.fit(_train.T)
+def load_data():
+    # Parsed once, then memory-mapped from the binary dataset cache on restarts
+    return timed_import("dataset_cache").load_movielens(min_rating=4.0)
 
-    lightfm_model = LightFM(no_components=20, loss='warp')
-    lightfm_model.fit(_train, epochs=10, num_threads=2)
+@st.cache_resource
+def load_backend(model_name):
+    # A backend imports its libraries and maps its artifacts only once selected
+    return get_backend(model_name)
 
-    return als_model, lightfm_model
+@st.cache_resource
+def load_result_cache():
+    # Shared by every session of this process; keyed on the model version
+    return timed_import("result_cache").RecommendationCache(max_bytes=32 << 20, ttl=3600)
 
-train, test, item_labels = load_data()
-als_model, lightfm_model = train_models(train)
+@st.cache_resource
+def load_cold_start():
+    # Built by `python cold_start.py`; without it new users cannot be answered
+    cold_start = timed_import("cold_start")
+    return cold_start.ColdStartTable.load() if os.path.isdir(cold_start.TABLE_DIR) else None
 
 # UI elements
-model_choice = st.selectbox("Choose a model:", ["ALS", "LightFM"])
-user_id = st.number_input("Enter a user ID (0 to 942)", min_value=0, max_value=942, value=1)
+model_choice = st.selectbox("Choose a model:", list(BACKENDS))
+user_id = st.number_input("Enter a user ID (0 to 942, higher for a new user)", min_value=0, value=1)
+with st.expander("New user profile (used when the ID is unknown)"):
+    age = st.number_input("Age", min_value=1, max_value=100, value=30)
+    gender = st.selectbox("Gender", ["", "F", "M"])
+    occupation = st.text_input("Occupation")
+    zip_code = st.text_input("Zip code")
 
 if st.button("Recommend"):
-    if model_choice == "ALS":
-        recommended = als_model.recommend(user_id, train[user_id], N=10)
-        recommended_ids = [r[0] for r in recommended]
-    else:
-        scores = lightfm_model.predict(user_id, np.arange(train.shape[1]))
-        recommended_ids = np.argsort(-scores)[:10]
+    train, _, item_labels = load_data()
+    known = user_id < train.shape[0]
+    cold_start = load_cold_start()
+
+    if cold_start is not None and cold_start.is_cold(user_id, COLD_START_MIN_INTERACTIONS):
+        # Table lookup only: no model is loaded or scored for cold users
+        if known:
+            seen = train.indices[train.indptr[user_id]:train.indptr[user_id + 1]]
+            recommended_ids = cold_start.recommend_user(user_id, 10, seen=seen)
+        else:
+            recommended_ids = cold_start.recommend(10, age=age, gender=gender, occupation=occupation,
+                                                   zip_code=zip_code)
+        st.subheader("Top 10 Movies Popular With Similar Users:")
+        for i, movie_id in enumerate(recommended_ids, 1):
+            st.write(f"{i}. {item_labels[movie_id]}")
+        st.stop()
+    if not known:
+        st.error("Unknown user ID. Run `python cold_start.py` to enable recommendations for new users.")
+        st.stop()
+
+    backend = load_backend(model_choice)
+    try:
+        version = backend.version()
+    except BackendUnavailable:
+        st.error(f"No trained {model_choice} model found. Run `python train.py` first.")
+        st.stop()
+
+    recommended_ids, _ = load_result_cache().get_or_compute(
+        model_choice, version, user_id, 10, ("exclude_seen",),
+        lambda: backend.recommend(user_id, 10, exclude=train, version=version))
 
     st.subheader("Top 10 Recommended Movies:")
     for i, movie_id in enumerate(recommended_ids, 1):
         st.write(f"{i}. {item_labels[movie_id]}")
+
+if PROFILE_IMPORTS:
+    with st.sidebar.expander("⏱️ Import profile"):
+        st.write(f"Script run: {(time.perf_counter() - _app_start) * 1000:.0f} ms")
+        for module, seconds in import_report():
+            st.write(f"`{module}`: {seconds * 1000:.1f} ms")
@@ -0,0 +1,179 @@
+import importlib
+import os
+import sys
+import threading
+import time
+
+# RECSYS_PROFILE_IMPORTS=1 prints every backend import as it happens
+PROFILE_IMPORTS = os.environ.get("RECSYS_PROFILE_IMPORTS", "") not in ("", "0")
+IMPORT_TIMES = {}
+
+
+class BackendUnavailable(LookupError):
+    pass
+
+
+# ----------------- Import Profiling -----------------
+def timed_import(name):
+    """Import `name`, recording how long the first import took."""
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES[name] = time.perf_counter() - start
+    if PROFILE_IMPORTS:
+        print(f"[import] {name:<24} {IMPORT_TIMES[name] * 1000:8.1f} ms")
+    return module
+
+
+def import_report():
+    """(module, seconds) pairs, slowest first."""
+    return sorted(IMPORT_TIMES.items(), key=lambda item: -item[1])
+
+
+# ----------------- Backends -----------------
+class ModelBackend:
+    """A model the app can serve.
+
+    Nothing is imported or read from disk until the backend is first selected:
+    `modules` are imported by `ensure_ready` and artifacts are loaded by `load`.
+    """
+
+    name = None
+    modules = ()
+
+    def __init__(self):
+        self.lib = {}
+        self._lock = threading.Lock()
+
+    def ensure_ready(self):
+        with self._lock:
+            if not self.lib:
+                self.lib = {module: timed_import(module) for module in self.modules}
+
+    def version(self):
+        raise NotImplementedError
+
+    def recommend(self, user, n, exclude=None, version=None):
+        """(item ids, scores) for one user, best first; `exclude` is a CSR of items to skip.
+
+        `version` pins the result to a value previously returned by `version()`;
+        None means the current one.
+        """
+        raise NotImplementedError
+
+
+class FactorBackend(ModelBackend):
+    """Serves a factor model published to the registry (ALS, LightFM), memory-mapped.
+
+    Known users are answered from the precomputed top-N store when it matches
+    the published version; everyone else is searched in the version's IVF index,
+    or scored exactly against the item factors when it was published without one.
+    """
+
+    modules = ("numpy", "model_registry", "scoring", "topn_store", "precompute_topn")
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self._loaded = None
+
+    def version(self):
+        # LATEST is re-read per call so a newly published version is picked up
+        self.ensure_ready()
+        registry = self.lib["model_registry"]
+        try:
+            return registry.latest_version(self.name)
+        except registry.ModelNotFound as exc:
+            raise BackendUnavailable(f"No published {self.name} model") from exc
+
+    def load(self, version):
+        self.ensure_ready()
+        with self._lock:
+            if self._loaded is None or self._loaded[0] != version:
+                registry = self.lib["model_registry"]
+                arrays, meta = registry.load(self.name, version)
+                factors = tuple(arrays.get(key) for key in registry.FACTOR_NAMES)
+                path = self.lib["precompute_topn"].store_path(self.name)
+                store = self.lib["topn_store"].TopNStore(path) if os.path.exists(path) else None
+                if store is not None and store.model_version != meta["version"]:
+                    store = None
+                self._loaded = (version, factors, meta, store, registry.ann_index_from(arrays, meta))
+            return self._loaded
+
+    def recommend(self, user, n, exclude=None, version=None):
+        _, factors, meta, store, index = self.load(version or self.version())
+        if store is not None and user in store and store.n >= n:
+            return store.lookup(user, n)
+        user_vectors, item_vectors, user_biases, item_biases = factors
+        if index is None:
+            ids, scores = self.lib["scoring"].top_k_scores(user_vectors, item_vectors, [user], n,
+                                                              user_biases, item_biases, exclude=exclude)
+        else:
+            # The index holds [v, b_i] for biased models (ann.with_biases), so the query is [u, 1]
+            query = user_vectors[user]
+            if item_biases is not None:
+                query = self.lib["numpy"].append(query, query.dtype.type(1))
+            ids, scores = index.search(query, n, exclude=exclude, users=[user])
+            if user_biases is not None:
+                scores += user_biases[user]
+        valid = ids[0] >= 0
+        return ids[0][valid], scores[0][valid]
+
+
+class TwoStageBackend(ModelBackend):
+    """ALS retrieves candidates, LightFM re-ranks them (see two_stage.py)."""
+
+    name = "ALS → LightFM"
+    modules = ("two_stage",)
+
+    def __init__(self, retrieval="ALS", ranking="LightFM", n_candidates=300):
+        super().__init__()
+        self.stage_names = (retrieval, ranking)
+        self.n_candidates = n_candidates
+        self._pipeline = None
+
+    def stages(self):
+        return [get_backend(name) for name in self.stage_names]
+
+    def version(self):
+        return "+".join(backend.version() for backend in self.stages())
+
+    def recommend(self, user, n, exclude=None, version=None):
+        self.ensure_ready()
+        versions = tuple((version or self.version()).split("+"))
+        (_, retrieval, _, _, _), (_, ranking, _, _, _) = (
+            backend.load(stage_version) for backend, stage_version in zip(self.stages(), versions))
+        # The pipeline holds both factor sets; rebuilt when either version or the exclusions change
+        key = (versions, id(exclude))
+        with self._lock:
+            if self._pipeline is None or self._pipeline[0] != key:
+                pipeline = self.lib["two_stage"].TwoStageRecommender(retrieval, ranking, self.n_candidates,
+                                                                     exclude=exclude)
+                self._pipeline = (key, pipeline)
+            pipeline = self._pipeline[1]
+        ids, scores = pipeline.recommend([user], n)
+        valid = ids[0] >= 0
+        return ids[0][valid], scores[0][valid]
+
+
+BACKENDS = {}
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def register_backend(name, factory):
+    """Make a backend selectable; `factory()` runs only when it is first used."""
+    BACKENDS[name] = factory
+
+
+def get_backend(name):
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = BACKENDS[name]()
+        return _instances[name]
+
+
+register_backend("ALS", lambda: FactorBackend("ALS"))
+register_backend("LightFM", lambda: FactorBackend("LightFM"))
+register_backend(TwoStageBackend.name, TwoStageBackend)
@@ -0,0 +1,201 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNTHETIC_DIR = os.path.join(BASE_DIR, ".cache", "synthetic")
+DATASETS = {"ml-100k": None, "1M": 1_000_000, "10M": 10_000_000, "50M": 50_000_000}
+K = 10
+LATENCY_SAMPLES = 1000
+
+
+# ----------------- Synthetic Data -----------------
+def generate_power_law(path, nnz, users_per_nnz=1 / 100, items_per_nnz=1 / 500, exponent=1.1,
+                       chunk_size=5_000_000, seed=0):
+    """Write a u.data-style TSV whose user activity and item popularity follow a power law."""
+    rng = np.random.default_rng(seed)
+    n_users = max(100, int(nnz * users_per_nnz))
+    n_items = max(100, int(nnz * items_per_nnz))
+    user_p = 1.0 / np.arange(1, n_users + 1) ** exponent
+    item_p = 1.0 / np.arange(1, n_items + 1) ** exponent
+    user_p /= user_p.sum()
+    item_p /= item_p.sum()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        for start in range(0, nnz, chunk_size):
+            size = min(chunk_size, nnz - start)
+            chunk = pd.DataFrame({
+                "user": rng.choice(n_users, size, p=user_p) + 1,
+                "item": rng.choice(n_items, size, p=item_p) + 1,
+                "rating": rng.integers(1, 6, size),
+                "timestamp": rng.integers(874_724_710, 893_286_638, size),
+            })
+            chunk.to_csv(f, sep="\t", header=False, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def dataset_path(name):
+    if DATASETS[name] is None:
+        return os.path.join(BASE_DIR, "data", "ml-100k", "u.data")
+    path = os.path.join(SYNTHETIC_DIR, f"power_law_{name}.tsv")
+    if not os.path.exists(path):
+        print(f"🧬 Generating {name} synthetic interactions...")
+        generate_power_law(path, DATASETS[name])
+    return path
+
+
+# ----------------- Measurement -----------------
+def process_peak_rss_mb():
+    # High-water mark of the whole process so far, not of the current stage
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+class Recorder:
+    def __init__(self):
+        self.stages = {}
+
+    def time(self, stage, fn, n_items=None):
+        # n_items (a count, or a function of the stage result) turns time into throughput
+        peak_before = process_peak_rss_mb()
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+        peak_after = process_peak_rss_mb()
+        # Growth of the high-water mark is the part of the process peak this stage is responsible for
+        self.stages[stage] = {"seconds": seconds, "process_peak_rss_mb": peak_after,
+                              "peak_rss_growth_mb": peak_after - peak_before}
+        if callable(n_items):
+            n_items = n_items(result)
+        if n_items:
+            self.stages[stage]["throughput"] = n_items / seconds if seconds > 0 else float("inf")
+        print(f"  {stage:<20} {seconds:8.3f}s")
+        return result
+
+    def latencies(self, stage, fn, calls):
+        samples = []
+        for args in calls:
+            start = time.perf_counter()
+            fn(*args)
+            samples.append((time.perf_counter() - start) * 1000)
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        self.stages[stage] = {"seconds": float(np.sum(samples)) / 1000, "p50_ms": p50, "p95_ms": p95,
+                              "p99_ms": p99, "process_peak_rss_mb": process_peak_rss_mb()}
+        print(f"  {stage:<20} p50={p50:.3f}ms p99={p99:.3f}ms")
+
+
+# ----------------- Stages -----------------
+def run_dataset(name, factors=50, iterations=10):
+    """Time every pipeline stage on one dataset; runs in its own process so peak RSS is per dataset."""
+    from implicit.als import AlternatingLeastSquares
+
+    from dataset_cache import load_interactions
+    from evaluation import als_recommend_block, evaluate_ranking
+    from implicit_baseline import load_data, preprocess
+    from splitting import split_csr
+    from streaming import read_interactions
+
+    path = dataset_path(name)
+    recorder = Recorder()
+    print(f"\n⏱️  {name} ({path})")
+
+    df = recorder.time("load_data", lambda: load_data(path), len)
+    n_rows = len(df)
+    matrix, _, _ = recorder.time("preprocess", lambda: preprocess(df), n_rows)
+    del df
+    recorder.time("streaming_load", lambda: read_interactions(path), n_rows)
+    cache_dir = os.path.join(BASE_DIR, ".cache", "benchmark")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    recorder.time("cache_build", lambda: load_interactions(path, cache_dir=cache_dir), n_rows)
+    recorder.time("cache_load", lambda: load_interactions(path, cache_dir=cache_dir), n_rows)
+
+    train, test = recorder.time("split", lambda: split_csr(matrix, seed=0), matrix.nnz)
+    train = train.astype(np.float32)
+    model = AlternatingLeastSquares(factors=factors, iterations=iterations, random_state=0)
+    recorder.time("fit", lambda: model.fit(train, show_progress=False), train.nnz * iterations)
+
+    rng = np.random.default_rng(0)
+    users = rng.choice(train.shape[0], min(LATENCY_SAMPLES, train.shape[0]), replace=False)
+    recorder.latencies("recommend", lambda user: model.recommend(user, train[user], N=K),
+                       [(user,) for user in users])
+    recorder.time("recommend_batch", lambda: model.recommend(users, train[users], N=K), len(users))
+
+    eval_users = np.flatnonzero(np.diff(test.indptr))
+    recorder.time("evaluate", lambda: evaluate_ranking(als_recommend_block(model, train), test,
+                                                       ks=(K,), show_progress=False), len(eval_users))
+    return {"nnz": int(matrix.nnz), "shape": list(matrix.shape), "stages": recorder.stages}
+
+
+# ----------------- Regression Check -----------------
+def compare(results, baseline, tolerance=0.2):
+    """Stages whose time grew by more than `tolerance` relative to the baseline."""
+    regressions = []
+    for name, current in results["datasets"].items():
+        reference = baseline.get("datasets", {}).get(name)
+        if reference is None:
+            continue
+        for stage, stats in current["stages"].items():
+            before = reference["stages"].get(stage, {}).get("seconds")
+            if before and stats["seconds"] > before * (1 + tolerance):
+                regressions.append({"dataset": name, "stage": stage, "baseline_seconds": before,
+                                    "seconds": stats["seconds"], "ratio": stats["seconds"] / before})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each recsys stage on ml-100k and synthetic data.")
+    parser.add_argument("--datasets", nargs="+", default=["ml-100k", "1M"], choices=list(DATASETS))
+    parser.add_argument("--output", default=os.path.join(BASE_DIR, "outputs", "benchmark.json"))
+    parser.add_argument("--baseline", default=os.path.join(BASE_DIR, "benchmark_baseline.json"))
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "datasets": {},
+    }
+    for name in args.datasets:
+        # A fresh process per dataset keeps ru_maxrss a per-dataset peak
+        with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+            results["datasets"][name] = pool.submit(run_dataset, name).result()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📄 Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for row in regressions:
+            print(f"⚠️  {row['dataset']}/{row['stage']}: {row['baseline_seconds']:.3f}s -> "
+                  f"{row['seconds']:.3f}s ({row['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from dataset_cache import load_arrays, load_movielens, save_arrays
+from scoring import top_k_rows
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+USERS_PATH = os.path.join(BASE_DIR, "data", "ml-100k", "u.user")
+TABLE_DIR = os.path.join(BASE_DIR, "outputs", "cold_start")
+N = 50
+MIN_SEGMENT_USERS = 20
+ZIP_PREFIX = 2
+AGE_EDGES = (18, 25, 35, 45, 50, 56)
+AGE_LABELS = ("<18", "18-24", "25-34", "35-44", "45-49", "50-55", "56+")
+# Most specific first; the empty level is the global popularity list
+LEVELS = (("age", "gender", "occupation"), ("age", "gender"), ("occupation",), ("zip",), ("age",), ())
+
+
+# ----------------- Profiles -----------------
+def age_bucket(age):
+    return AGE_LABELS[int(np.searchsorted(AGE_EDGES, age, side="right"))]
+
+
+def profile_fields(age=None, gender=None, occupation=None, zip_code=None):
+    """Segment fields of one profile; missing values simply skip the levels that need them."""
+    fields = {}
+    if age is not None:
+        fields["age"] = age_bucket(age)
+    if gender:
+        fields["gender"] = str(gender).upper()
+    if occupation:
+        fields["occupation"] = str(occupation).lower()
+    if zip_code:
+        fields["zip"] = str(zip_code)[:ZIP_PREFIX]
+    return fields
+
+
+def segment_key(fields, level):
+    if any(name not in fields for name in level):
+        return None
+    return "|".join(f"{name}={fields[name]}" for name in level)
+
+
+def load_users(path=USERS_PATH):
+    # u.user: user id | age | gender | occupation | zip code, ids starting at 1
+    users = pd.read_csv(path, sep="|", names=["user", "age", "gender", "occupation", "zip"], dtype={"zip": str})
+    users["age"] = [age_bucket(age) for age in users["age"]]
+    users["gender"] = users["gender"].str.upper()
+    users["occupation"] = users["occupation"].str.lower()
+    users["zip"] = users["zip"].str[:ZIP_PREFIX]
+    return users
+
+
+# ----------------- Lookup Table -----------------
+class ColdStartTable:
+    """Top-N lists per demographic segment plus a global list, answered by dict lookup.
+
+    `lists` is an (n_segments, N) int32 array (-1 padded) and `keys` names its
+    rows. `user_rows[u]` is the precomputed most specific segment for known user
+    u and `user_counts[u]` their interaction count, so known users cost two
+    array reads and unknown profiles one dict lookup per backoff level.
+    """
+
+    def __init__(self, keys, lists, user_rows, user_counts):
+        self.keys = np.asarray(keys)
+        self.lists = lists
+        self.user_rows = user_rows
+        self.user_counts = user_counts
+        self._rows = {str(key): row for row, key in enumerate(self.keys)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def is_cold(self, user, min_interactions):
+        return not 0 <= user < len(self.user_counts) or self.user_counts[user] < min_interactions
+
+    def segment_row(self, fields):
+        for level in LEVELS:
+            key = segment_key(fields, level)
+            if key is not None and key in self._rows:
+                return self._rows[key]
+        raise KeyError("Cold-start table has no global list")
+
+    def _top(self, row, n, seen):
+        ids = self.lists[row]
+        ids = ids[ids >= 0]
+        if seen is not None and len(seen):
+            ids = ids[~np.isin(ids, seen)]
+        return ids[:n]
+
+    def recommend(self, n=10, seen=None, **profile):
+        """Top-n for a profile given as age / gender / occupation / zip_code keywords."""
+        return self._top(self.segment_row(profile_fields(**profile)), n, seen)
+
+    def recommend_user(self, user, n=10, seen=None):
+        row = self.user_rows[user] if 0 <= user < len(self.user_rows) else self._rows[""]
+        return self._top(row, n, seen)
+
+    def save(self, directory=TABLE_DIR):
+        save_arrays(directory, {"keys": self.keys.astype(str), "lists": self.lists,
+                                "user_rows": self.user_rows, "user_counts": self.user_counts},
+                    overwrite=True)
+
+    @classmethod
+    def load(cls, directory=TABLE_DIR, mmap=True):
+        arrays = load_arrays(directory, mmap=mmap)
+        return cls(arrays["keys"], arrays["lists"], arrays["user_rows"], arrays["user_counts"])
+
+
+# ----------------- Build -----------------
+def build_table(train, users, n=N, min_segment_users=MIN_SEGMENT_USERS):
+    """Popularity top-n per segment of every level in LEVELS, from a user x item CSR.
+
+    Row u of `train` must be user id u + 1 in `users` (the MovieLens layout).
+    Segments with fewer than `min_segment_users` users are dropped so lookups
+    back off to a broader level.
+    """
+    liked = csr_matrix(train, copy=True)
+    liked.data = np.ones_like(liked.data, dtype=np.float32)
+    users = users.set_index("user").reindex(np.arange(1, train.shape[0] + 1))
+    fields = users[["age", "gender", "occupation", "zip"]]
+
+    keys, blocks, level_rows = [], [], []
+    for level in LEVELS:
+        if level:
+            complete = fields[list(level)].notna().all(axis=1).to_numpy()
+            level_keys = np.array(["|".join(f"{name}={value}" for name, value in zip(level, row))
+                                   for row in fields[list(level)].astype(str).itertuples(index=False)])
+        else:
+            complete = np.ones(train.shape[0], dtype=bool)
+            level_keys = np.full(train.shape[0], "")
+        rows = np.flatnonzero(complete)
+        codes, uniques = pd.factorize(level_keys[rows])
+        # Segment x user indicator times user x item likes = per-segment item counts
+        indicator = csr_matrix((np.ones(len(rows), dtype=np.float32), (codes, rows)),
+                               shape=(len(uniques), train.shape[0]))
+        keep = (np.bincount(codes, minlength=len(uniques)) >= min_segment_users) | (not level)
+        # Table row of every user's segment at this level, -1 if dropped or incomplete
+        table_rows = np.where(keep, len(keys) + np.cumsum(keep) - 1, -1)
+        user_level_rows = np.full(train.shape[0], -1, dtype=np.int64)
+        user_level_rows[rows] = table_rows[codes]
+        level_rows.append(user_level_rows)
+        blocks.append((indicator[keep] @ liked).toarray())
+        keys.extend(uniques[keep])
+
+    counts = np.vstack(blocks)
+    ids, scores = top_k_rows(counts, min(n, counts.shape[1]))
+    lists = np.where(scores > 0, ids, -1).astype(np.int32)
+
+    # Each known user's most specific surviving segment, resolved once here
+    user_rows = level_rows[-1].astype(np.int32)
+    for rows in reversed(level_rows[:-1]):
+        user_rows = np.where(rows >= 0, rows, user_rows).astype(np.int32)
+    return ColdStartTable(np.array(keys, dtype=str), lists, user_rows, np.diff(liked.indptr).astype(np.int32))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute demographic cold-start recommendation lists.")
+    parser.add_argument("--n", type=int, default=N)
+    parser.add_argument("--min-segment-users", type=int, default=MIN_SEGMENT_USERS)
+    parser.add_argument("--output", default=TABLE_DIR)
+    args = parser.parse_args()
+
+    print("📥 Loading interactions and user profiles...")
+    train, _, _ = load_movielens(min_rating=4.0)
+    users = load_users()
+
+    print("🧮 Counting segment popularity...")
+    table = build_table(train, users, args.n, args.min_segment_users)
+    table.save(args.output)
+    print(f"✅ {len(table)} segment lists written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from dataset_cache import arrays_to_csr, csr_to_arrays, load_interactions, load_or_build
+from splitting import kfold_csr
+from sweep import limit_blas_threads
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data", "ml-100k")
+FOLD_SETS = {"u": ["u1", "u2", "u3", "u4", "u5"], "ua": ["ua"], "ub": ["ub"]}
+MODELS = ("ALS", "LightFM", "SVD")
+K = 10
+SEED = 42
+
+
+# ----------------- Folds -----------------
+def _build_shipped_folds(data_dir, names):
+    # One id mapping from u.data for every fold, so base and test rows line up
+    from streaming import COLUMNS, read_interactions
+
+    full = read_interactions(os.path.join(data_dir, "u.data"))
+    arrays = {**full.users.to_arrays("user_"), **full.items.to_arrays("item_")}
+    for name in names:
+        for part, prefix in (("base", "train"), ("test", "test")):
+            df = pd.read_csv(os.path.join(data_dir, f"{name}.{part}"), sep="\t", names=COLUMNS)
+            rows = full.users.to_index(df["user"].to_numpy())
+            cols = full.items.to_index(df["item"].to_numpy())
+            matrix = csr_matrix((df["rating"].to_numpy(np.float32), (rows, cols)), shape=full.matrix.shape)
+            arrays.update(csr_to_arrays(matrix, f"{name}_{prefix}_"))
+    return arrays
+
+
+def _build_generated_folds(path, k, seed):
+    arrays = {}
+    for fold, (train, test) in enumerate(kfold_csr(load_interactions(path).matrix, k, seed), 1):
+        arrays.update(csr_to_arrays(train, f"k{fold}_train_"))
+        arrays.update(csr_to_arrays(test, f"k{fold}_test_"))
+    return arrays
+
+
+def load_folds(fold_set="u", k=5, seed=SEED, data_dir=DATA_DIR):
+    """{fold name: (train CSR, test CSR)} from the shipped ml-100k folds or `k` random folds.
+
+    fold_set is "u" (u1..u5), "ua", "ub" or "kfold". Folds are cached as .npy
+    arrays on first use and memory-mapped afterwards.
+    """
+    if fold_set == "kfold":
+        path = os.path.join(data_dir, "u.data")
+        names = [f"k{fold}" for fold in range(1, k + 1)]
+        arrays = load_or_build("folds", [path], {"k": k, "seed": seed},
+                               lambda: _build_generated_folds(path, k, seed))
+    else:
+        names = FOLD_SETS[fold_set]
+        sources = [os.path.join(data_dir, "u.data")] + [
+            os.path.join(data_dir, f"{name}.{part}") for name in names for part in ("base", "test")]
+        arrays = load_or_build("folds", sources, {"folds": names},
+                               lambda: _build_shipped_folds(data_dir, names))
+    return {name: (arrays_to_csr(arrays, f"{name}_train_"), arrays_to_csr(arrays, f"{name}_test_"))
+            for name in names}
+
+
+# ----------------- Models -----------------
+def _ranking_metrics(recommend, test):
+    from evaluation import evaluate_ranking
+
+    return evaluate_ranking(recommend, test, ks=(K,), show_progress=False)[K]
+
+
+def run_als(train, test, threads):
+    from implicit.als import AlternatingLeastSquares
+
+    from evaluation import als_recommend_block
+    from implicit_baseline import FACTORS, ITERATIONS, REGULARIZATION
+
+    model = AlternatingLeastSquares(factors=FACTORS, iterations=ITERATIONS, regularization=REGULARIZATION,
+                                    num_threads=threads, random_state=SEED)
+    model.fit(train, show_progress=False)
+    return _ranking_metrics(als_recommend_block(model, train), test)
+
+
+def run_lightfm(train, test, threads):
+    from lightfm import LightFM
+
+    from lightfm_baseline import EPOCHS, LEARNING_RATE, NO_COMPONENTS
+    from scoring import factor_recommend_block, lightfm_factors
+
+    model = LightFM(no_components=NO_COMPONENTS, loss="warp", learning_rate=LEARNING_RATE,
+                    random_state=SEED)
+    model.fit(train, epochs=EPOCHS, num_threads=threads)
+    return _ranking_metrics(factor_recommend_block(lightfm_factors(model), exclude=train), test)
+
+
+def run_svd(train, test, threads):
+    # Rating prediction scored with RMSE/MAE, plus ranking of the full catalogue
+    from surprise import SVD, Dataset, Reader
+
+    from evaluation import rating_metrics
+    from scoring import factor_recommend_block, predict_ratings, svd_factors, svd_global_mean
+
+    coo = train.tocoo()
+    df = pd.DataFrame({"user": coo.row, "item": coo.col, "rating": coo.data})
+    trainset = Dataset.load_from_df(df, Reader(rating_scale=(1, 5))).build_full_trainset()
+    model = SVD(random_state=SEED)
+    model.fit(trainset)
+
+    factors = svd_factors(model, np.arange(train.shape[0]), np.arange(train.shape[1]))
+    test = test.tocoo()
+    predictions = predict_ratings(factors, test.row, test.col, svd_global_mean(model), trainset.rating_scale)
+    return {**rating_metrics(predictions, test.data),
+            **_ranking_metrics(factor_recommend_block(factors, exclude=train), test.tocsr())}
+
+
+RUNNERS = {"ALS": run_als, "LightFM": run_lightfm, "SVD": run_svd}
+
+
+# ----------------- Parallel Runner -----------------
+def run_task(model_name, fold, fold_set, k, seed, threads):
+    # Workers re-open the cached folds by name instead of receiving pickled matrices
+    train, test = load_folds(fold_set, k, seed)[fold]
+    start = time.perf_counter()
+    metrics = RUNNERS[model_name](train, test, threads)
+    return {"model": model_name, "fold": fold, **{name: float(value) for name, value in metrics.items()},
+            "seconds": time.perf_counter() - start}
+
+
+def cross_validate(models=MODELS, fold_set="u", k=5, seed=SEED, workers=None):
+    """Train and evaluate every (model, fold) pair on a spawn process pool."""
+    folds = list(load_folds(fold_set, k, seed))
+    tasks = [(model_name, fold) for model_name in models for fold in folds]
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    rows = []
+    # Workers start on the first submit, so the BLAS limit is applied inside each of them
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                             initializer=limit_blas_threads, initargs=(threads,)) as pool:
+        futures = [pool.submit(run_task, model_name, fold, fold_set, k, seed, threads)
+                   for model_name, fold in tasks]
+        for future in as_completed(futures):
+            row = future.result()
+            print(f"  {row['model']:<8} {row['fold']:<4} done in {row['seconds']:.1f}s")
+            rows.append(row)
+    return pd.DataFrame(rows).sort_values(["model", "fold"]).reset_index(drop=True)
+
+
+def summarize(results):
+    """Mean and std of every metric per model, over folds."""
+    metrics = [column for column in results.columns if column not in ("model", "fold", "seconds")]
+    return results.groupby("model")[metrics].agg(["mean", "std"])
+
+
+def print_summary(summary):
+    for model_name, row in summary.iterrows():
+        print(f"\n📊 {model_name}")
+        for metric in summary.columns.levels[0]:
+            mean, std = row[(metric, "mean")], row[(metric, "std")]
+            if not np.isnan(mean):
+                print(f"  {metric:<10} {mean:.4f} ± {0.0 if np.isnan(std) else std:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validate ALS, LightFM and SVD on ml-100k folds.")
+    parser.add_argument("--folds", choices=list(FOLD_SETS) + ["kfold"], default="u")
+    parser.add_argument("--k", type=int, default=5, help="number of generated folds for --folds kfold")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    print("📥 Loading folds...")
+    folds = load_folds(args.folds, args.k, args.seed)
+    print(f"🔁 Running {len(args.models)} models x {len(folds)} folds...")
+    start = time.perf_counter()
+    results = cross_validate(args.models, args.folds, args.k, args.seed, args.workers)
+    print(f"⏱️  Cross-validation took {time.perf_counter() - start:.1f}s")
+    print_summary(summarize(results))
+
+    output = args.output or os.path.join(BASE_DIR, "outputs", f"crossval_{args.folds}.csv")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    results.to_csv(output, index=False)
+    print(f"\n📄 Per-fold results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+CACHE_FORMAT = 3
+
+Interactions = namedtuple("Interactions", ["matrix", "users", "items", "timestamps"])
+
+
+# ----------------- Cache Keys -----------------
+def file_digest(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(sources, options, content_hash=False):
+    """Stable key over the source files and preprocessing options.
+
+    By default a source is identified by its path, size and mtime; with
+    `content_hash` the file bytes are hashed instead, so touching or copying
+    the file keeps the cache valid.
+    """
+    fingerprint = {"format": CACHE_FORMAT, "options": options, "sources": []}
+    for path in sources:
+        path = os.path.abspath(os.path.expanduser(path))
+        if content_hash:
+            fingerprint["sources"].append([path, file_digest(path)])
+        else:
+            stat = os.stat(path)
+            fingerprint["sources"].append([path, stat.st_size, stat.st_mtime_ns])
+    payload = json.dumps(fingerprint, sort_keys=True, default=str).encode()
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+# ----------------- Array Store -----------------
+def save_arrays(directory, arrays, meta=None, overwrite=False):
+    # Written to a temp dir and renamed into place so readers never see a partial entry
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({"arrays": sorted(arrays), **(meta or {})}, f)
+        if overwrite and os.path.isdir(directory):
+            # Move the old entry aside first; open memory maps keep their pages
+            old = tempfile.mkdtemp(dir=parent, prefix=".old-")
+            os.replace(directory, os.path.join(old, "entry"))
+            os.replace(tmp, directory)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.replace(tmp, directory)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        # Another process may have published the same cache entry first
+        if not os.path.isdir(directory):
+            raise
+
+
+def load_arrays(directory, mmap=True):
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    # Copy-on-write maps share pages between processes but still allow in-place edits
+    mode = "c" if mmap else None
+    return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)
+            for name in meta["arrays"]}
+
+
+def load_or_build(name, sources, options, build, cache_dir=CACHE_DIR, mmap=True,
+                  content_hash=False):
+    directory = os.path.join(cache_dir, f"{name}-{cache_key(sources, options, content_hash)}")
+    if not os.path.isfile(os.path.join(directory, "meta.json")):
+        save_arrays(directory, build(), meta={"name": name, "options": options})
+    return load_arrays(directory, mmap=mmap)
+
+
+# ----------------- Interaction Matrices -----------------
+def csr_to_arrays(matrix, prefix=""):
+    matrix = csr_matrix(matrix)
+    return {
+        f"{prefix}indptr": matrix.indptr,
+        f"{prefix}indices": matrix.indices,
+        f"{prefix}data": matrix.data,
+        f"{prefix}shape": np.asarray(matrix.shape, dtype=np.int64),
+    }
+
+
+def arrays_to_csr(arrays, prefix=""):
+    shape = tuple(int(n) for n in arrays[f"{prefix}shape"])
+    return csr_matrix((arrays[f"{prefix}data"], arrays[f"{prefix}indices"], arrays[f"{prefix}indptr"]),
+                      shape=shape, copy=False)
+
+
+def _build_interactions(path, binarize, min_rating):
+    from streaming import read_interactions
+
+    data = read_interactions(path, min_rating=min_rating, binarize=binarize)
+    arrays = csr_to_arrays(data.matrix)
+    arrays["timestamps"] = data.timestamps.data
+    arrays.update(data.users.to_arrays("user_"))
+    arrays.update(data.items.to_arrays("item_"))
+    return arrays
+
+
+def load_interactions(path, binarize=False, min_rating=None, cache_dir=CACHE_DIR, mmap=True,
+                      content_hash=False):
+    """Interaction CSR, user/item IdIndex mappings and a timestamp CSR for a u.data-style file.
+
+    The first call streams the TSV through streaming.read_interactions and
+    stores the arrays as .npy files under `cache_dir`; later calls with the
+    same file and options memory-map them.
+    """
+    from id_index import IdIndex
+
+    path = os.path.expanduser(path)
+    options = {"binarize": binarize, "min_rating": min_rating}
+    arrays = load_or_build("interactions", [path], options,
+                           lambda: _build_interactions(path, binarize, min_rating),
+                           cache_dir=cache_dir, mmap=mmap, content_hash=content_hash)
+
+    matrix = arrays_to_csr(arrays)
+    timestamps = csr_matrix((arrays["timestamps"], matrix.indices, matrix.indptr),
+                            shape=matrix.shape, copy=False)
+    return Interactions(matrix, IdIndex.from_arrays(arrays, "user_"),
+                        IdIndex.from_arrays(arrays, "item_"), timestamps)
+
+
+# ----------------- MovieLens (LightFM split) -----------------
+def movielens_source(data_home=None):
+    # Where lightfm's fetch_movielens keeps its download (default data home ~/lightfm_data)
+    data_home = os.path.expanduser(data_home or os.path.join("~", "lightfm_data"))
+    return os.path.join(data_home, "movielens100k", "movielens.zip")
+
+
+def _build_movielens(min_rating, data_home=None):
+    from lightfm.datasets import fetch_movielens
+
+    data = fetch_movielens(data_home=data_home, min_rating=min_rating)
+    arrays = {**csr_to_arrays(data["train"], "train_"), **csr_to_arrays(data["test"], "test_")}
+    arrays["item_labels"] = data["item_labels"].astype(str)
+    return arrays
+
+
+def load_movielens(min_rating=4.0, cache_dir=CACHE_DIR, mmap=True, data_home=None):
+    """Train CSR, test CSR and item labels of lightfm's fetch_movielens split.
+
+    The cache is keyed on the downloaded archive, so a re-downloaded dataset
+    rebuilds the arrays.
+    """
+    source = movielens_source(data_home)
+    if not os.path.isfile(source):
+        # Download once up front so the archive can key the cache entry
+        from lightfm.datasets import fetch_movielens
+
+        fetch_movielens(data_home=data_home)
+    arrays = load_or_build("movielens", [source], {"min_rating": min_rating},
+                           lambda: _build_movielens(min_rating, data_home), cache_dir=cache_dir, mmap=mmap)
+    return arrays_to_csr(arrays, "train_"), arrays_to_csr(arrays, "test_"), arrays["item_labels"]
@@ -0,0 +1,106 @@
+import time
+
+import numpy as np
+
+from evaluation import evaluate_ranking
+
+
+class StopTraining(Exception):
+    pass
+
+
+# ----------------- Validation -----------------
+def sampled_validator(recommend, valid_matrix, k=10, metric="ndcg", n_users=1000, seed=0):
+    """Metric@k of `recommend` on a fixed random sample of the validation users.
+
+    The sample is drawn once, so successive epochs are compared on the same users.
+    """
+    candidates = np.flatnonzero(np.diff(valid_matrix.indptr))
+    rng = np.random.default_rng(seed)
+    users = np.sort(rng.choice(candidates, min(n_users, len(candidates)), replace=False))
+
+    def validate():
+        return evaluate_ranking(recommend, valid_matrix, ks=(k,), users=users, show_progress=False)[k][metric]
+    return validate
+
+
+# ----------------- Epoch Monitor -----------------
+class EpochMonitor:
+    """Per-epoch wall time, throughput and validation metric, with patience-based stopping.
+
+    `end_epoch` returns True once the metric has not improved by `min_delta` for
+    `patience` epochs in a row. `snapshot()` is called on every improvement so
+    the best parameters can be restored after training.
+    """
+
+    def __init__(self, validate, n_interactions, patience=3, min_delta=1e-4, snapshot=None, verbose=True):
+        self.validate = validate
+        self.n_interactions = n_interactions
+        self.patience = patience
+        self.min_delta = min_delta
+        self.snapshot = snapshot
+        self.verbose = verbose
+        self.history = []
+        self.best_metric = -np.inf
+        self.best_epoch = None
+        self.best_state = None
+        self._stale = 0
+
+    def end_epoch(self, epoch, seconds, loss=None):
+        start = time.perf_counter()
+        metric = float(self.validate())
+        record = {
+            "epoch": epoch,
+            "seconds": seconds,
+            "throughput": self.n_interactions / seconds if seconds > 0 else float("inf"),
+            "metric": metric,
+            "validation_seconds": time.perf_counter() - start,
+        }
+        if loss is not None:
+            record["loss"] = float(loss)
+        self.history.append(record)
+
+        if metric > self.best_metric + self.min_delta:
+            self.best_metric, self.best_epoch, self._stale = metric, epoch, 0
+            if self.snapshot is not None:
+                self.best_state = self.snapshot()
+        else:
+            self._stale += 1
+        if self.verbose:
+            print(f"  epoch {epoch:>3}: {seconds:6.2f}s  {record['throughput']:>12,.0f} interactions/s  "
+                  f"val={metric:.4f}{' *' if self.best_epoch == epoch else ''}")
+        return self._stale >= self.patience
+
+
+# ----------------- Drivers -----------------
+def fit_als(model, train, validate, patience=3, min_delta=1e-4, verbose=True):
+    """Fit implicit ALS for up to `model.iterations` iterations, stopping early; keeps the best factors."""
+    monitor = EpochMonitor(validate, train.nnz, patience, min_delta, verbose=verbose,
+                           snapshot=lambda: (model.user_factors.copy(), model.item_factors.copy()))
+
+    def callback(iteration, elapsed, loss):
+        if monitor.end_epoch(iteration + 1, elapsed, loss):
+            raise StopTraining
+
+    try:
+        model.fit(train, show_progress=False, callback=callback)
+    except StopTraining:
+        pass
+    if monitor.best_state is not None:
+        model.user_factors, model.item_factors = monitor.best_state
+    return monitor
+
+
+def fit_lightfm(model, train, validate, epochs, num_threads=1, patience=3, min_delta=1e-4, verbose=True):
+    """Step LightFM one epoch at a time with fit_partial, stopping early; keeps the best embeddings."""
+    attributes = ("user_embeddings", "item_embeddings", "user_biases", "item_biases")
+    monitor = EpochMonitor(validate, train.nnz, patience, min_delta, verbose=verbose,
+                           snapshot=lambda: {name: getattr(model, name).copy() for name in attributes})
+    for epoch in range(1, epochs + 1):
+        start = time.perf_counter()
+        model.fit_partial(train, epochs=1, num_threads=num_threads)
+        if monitor.end_epoch(epoch, time.perf_counter() - start):
+            break
+    for name, value in (monitor.best_state or {}).items():
+        setattr(model, name, value)
+    return monitor
@@ -0,0 +1,297 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.stats import norm
+from tqdm import tqdm
+
+METRICS = ("precision", "recall", "ndcg", "map")
+
+
+# ----------------- Discount Tables -----------------
+def discount_table(k):
+    # discounts[i] = 1 / log2(i + 2) for rank i (0-based)
+    return 1.0 / np.log2(np.arange(2, k + 2, dtype=np.float64))
+
+
+def ideal_dcg_table(k):
+    # idcg[n] = best achievable DCG with n relevant items, n = 0..k
+    return np.concatenate(([0.0], np.cumsum(discount_table(k))))
+
+
+# ----------------- Hit Matrix -----------------
+def hit_matrix(recommended, test_block):
+    """Boolean (n_users, K) array, True where the ranked item is in the test CSR.
+
+    `recommended` is an (n_users, K) item-id array (negative ids are padding).
+    The top-K lists are scattered into a sparse mask carrying 1-based ranks and
+    intersected with the binarized test block, so no per-user Python work is done.
+    """
+    n_users, k = recommended.shape
+    valid = recommended >= 0
+    rows = np.repeat(np.arange(n_users), k).reshape(n_users, k)[valid]
+    ranks = np.tile(np.arange(1, k + 1), (n_users, 1))[valid]
+    mask = csr_matrix((ranks, (rows, recommended[valid])), shape=(n_users, test_block.shape[1]))
+
+    relevant = test_block.copy()
+    relevant.data = np.ones_like(relevant.data)
+    hits = mask.multiply(relevant).tocoo()
+
+    out = np.zeros((n_users, k), dtype=bool)
+    out[hits.row, hits.data.astype(np.int64) - 1] = True
+    return out
+
+
+# ----------------- Metrics -----------------
+def ranking_metrics(hits, n_relevant, ks, discounts, idcg):
+    """Per-user metric arrays for every cut-off in `ks` from one hit matrix."""
+    cum_hits = np.cumsum(hits, axis=1)
+    gains = np.cumsum(hits * discounts[:hits.shape[1]], axis=1)
+    precision_terms = np.cumsum(hits * cum_hits / np.arange(1, hits.shape[1] + 1), axis=1)
+
+    results = {}
+    for k in ks:
+        n_hits = cum_hits[:, k - 1]
+        capped = np.minimum(n_relevant, k)
+        results[k] = {
+            "precision": n_hits / k,
+            "recall": n_hits / n_relevant,
+            "ndcg": gains[:, k - 1] / idcg[capped],
+            "map": precision_terms[:, k - 1] / capped,
+        }
+    return results
+
+
+# ----------------- Recommenders -----------------
+def als_recommend_block(model, train_matrix):
+    # Batch recommend API: one call scores a whole block of users
+    def recommend(users, k):
+        ids, _ = model.recommend(users, train_matrix[users], N=k, filter_already_liked_items=True)
+        return np.asarray(ids)
+    return recommend
+
+
+# ----------------- Engine -----------------
+def _score_block(recommend, test_matrix, block, ks, n_relevant_all, discounts, idcg):
+    max_k = ks[-1]
+    recommended = np.asarray(recommend(block, max_k))
+    if recommended.shape[1] < max_k:
+        padding = np.full((len(block), max_k - recommended.shape[1]), -1, dtype=recommended.dtype)
+        recommended = np.hstack([recommended, padding])
+    hits = hit_matrix(recommended, test_matrix[block])
+    return recommended, ranking_metrics(hits, n_relevant_all[block], ks, discounts, idcg)
+
+
+def evaluate_ranking(recommend, test_matrix, ks=(10,), users=None, batch_size=1024,
+                     show_progress=True):
+    """Precision/Recall/NDCG/MAP@K and catalogue coverage for several K in one pass.
+
+    `recommend(users, k)` must return an (len(users), k) array of item ids for a
+    block of users; only users with at least one test interaction are scored.
+    """
+    ks = sorted(set(ks))
+    max_k = ks[-1]
+    test_matrix = csr_matrix(test_matrix)
+    n_relevant_all = np.diff(test_matrix.indptr)
+    if users is None:
+        users = np.flatnonzero(n_relevant_all)
+    else:
+        users = np.asarray(users)
+        users = users[n_relevant_all[users] > 0]
+
+    discounts = discount_table(max_k)
+    idcg = ideal_dcg_table(max_k)
+    totals = {k: dict.fromkeys(METRICS, 0.0) for k in ks}
+    recommended_items = {k: np.zeros(test_matrix.shape[1], dtype=bool) for k in ks}
+
+    starts = range(0, len(users), batch_size)
+    for start in tqdm(starts, desc="Evaluating", disable=not show_progress):
+        block = users[start:start + batch_size]
+        recommended, block_metrics = _score_block(recommend, test_matrix, block, ks, n_relevant_all,
+                                                  discounts, idcg)
+        for k in ks:
+            for name in METRICS:
+                totals[k][name] += block_metrics[k][name].sum()
+            top = recommended[:, :k]
+            recommended_items[k][top[top >= 0]] = True
+
+    n_users = max(len(users), 1)
+    results = {}
+    for k in ks:
+        results[k] = {name: float(totals[k][name] / n_users) for name in METRICS}
+        results[k]["coverage"] = float(recommended_items[k].mean())
+    return results
+
+
+# ----------------- Sampled Evaluation -----------------
+def sample_users(test_matrix, activity=None, strategy="uniform", seed=None):
+    """Evaluable users in a random order whose every prefix is a valid sample.
+
+    uniform    -> a plain shuffle
+    stratified -> users are bucketed into deciles of `activity` (interactions
+                  per user, typically train row counts) and the shuffled deciles
+                  are interleaved, so any prefix holds each decile in proportion
+    """
+    rng = np.random.default_rng(seed)
+    users = np.flatnonzero(np.diff(csr_matrix(test_matrix).indptr))
+    users = users[rng.permutation(len(users))]
+    if strategy == "uniform":
+        return users
+    if strategy != "stratified":
+        raise ValueError(f"Unknown sampling strategy {strategy!r}, expected 'uniform' or 'stratified'")
+
+    activity = np.diff(csr_matrix(activity if activity is not None else test_matrix).indptr)[users]
+    # Rank-based deciles stay balanced even when many users share the same count
+    ranks = np.empty(len(users), dtype=np.int64)
+    ranks[np.argsort(activity, kind="stable")] = np.arange(len(users))
+    deciles = ranks * 10 // max(len(users), 1)
+    # Position of each user inside its decile, scaled to [0, 1): sorting on it interleaves deciles
+    within = np.zeros(len(users))
+    for decile in range(10):
+        members = np.flatnonzero(deciles == decile)
+        within[members] = (np.arange(len(members)) + rng.random()) / max(len(members), 1)
+    return users[np.argsort(within, kind="stable")]
+
+
+def negative_sampling_recommend(score_items, test_matrix, exclude=None, n_negatives=100, seed=None):
+    """Recommender that ranks each user's test items among `n_negatives` random unseen items.
+
+    `score_items(users, items)` scores an (len(users), n_candidates) item-id array,
+    e.g. factor_score_items(factors). Negatives that collide with train or test
+    items are masked, so metrics are computed over the sampled candidates only.
+    """
+    rng = np.random.default_rng(seed)
+    test_matrix = csr_matrix(test_matrix)
+    n_items = test_matrix.shape[1]
+
+    def recommend(users, k):
+        positives = test_matrix[users]
+        n_pos = np.diff(positives.indptr)
+        width = n_pos.max() + n_negatives
+        candidates = np.full((len(users), width), -1, dtype=np.int64)
+        rows = np.repeat(np.arange(len(users)), n_pos)
+        cols = np.arange(positives.nnz) - positives.indptr[rows]
+        candidates[rows, cols] = positives.indices
+        negatives = rng.integers(0, n_items, (len(users), n_negatives))
+        candidates[:, -n_negatives:] = negatives
+
+        scores = score_items(users, np.maximum(candidates, 0)).astype(np.float64)
+        scores[candidates < 0] = -np.inf
+        # Negatives must be unseen and not themselves test items
+        taken = (positives if exclude is None else positives + exclude[users]).tocsr()
+        neg_rows = np.repeat(np.arange(len(users)), n_negatives)
+        collide = np.asarray(taken[neg_rows, negatives.ravel()]).reshape(len(users), n_negatives) != 0
+        scores[:, -n_negatives:][collide] = -np.inf
+
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        top = np.take_along_axis(candidates, order, axis=1)
+        top[~np.isfinite(np.take_along_axis(scores, order, axis=1))] = -1
+        return top
+    return recommend
+
+
+def bootstrap_ci(values, confidence=0.95, n_resamples=1000, seed=None, chunk=100):
+    """Percentile bootstrap (low, high) interval for the mean of `values`."""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        mean = float(values.mean()) if len(values) else float("nan")
+        return mean, mean
+    rng = np.random.default_rng(seed)
+    means = []
+    # Resampled in chunks so memory stays at chunk * len(values)
+    for start in range(0, n_resamples, chunk):
+        size = min(chunk, n_resamples - start)
+        means.append(values[rng.integers(0, len(values), (size, len(values)))].mean(axis=1))
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(np.concatenate(means), [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def evaluate_sampled(recommend, test_matrix, ks=(10,), users=None, batch_size=1024, max_users=None,
+                     target_half_width=0.005, stop_metric="ndcg", min_users=1000, confidence=0.95,
+                     n_resamples=1000, seed=None, show_progress=True):
+    """Ranking metrics on a user sample, each with a bootstrap confidence interval.
+
+    Users are scored in `batch_size` blocks in the order given by `users` (see
+    sample_users). After each block the normal-approximation half-width of
+    `stop_metric`@max(ks) is checked; evaluation stops once it drops below
+    `target_half_width` (with at least `min_users` scored) or `max_users` is hit.
+    Returns {k: {metric: {"mean", "low", "high"}}, "n_users": n, "stopped_early": bool}.
+    """
+    ks = sorted(set(ks))
+    test_matrix = csr_matrix(test_matrix)
+    n_relevant_all = np.diff(test_matrix.indptr)
+    users = sample_users(test_matrix, seed=seed) if users is None else np.asarray(users)
+    users = users[n_relevant_all[users] > 0]
+    if max_users is not None:
+        users = users[:max_users]
+
+    discounts = discount_table(ks[-1])
+    idcg = ideal_dcg_table(ks[-1])
+    values = {k: {name: [] for name in METRICS} for k in ks}
+    z = norm.ppf(0.5 + confidence / 2)
+    scored, stopped_early = 0, False
+
+    progress = tqdm(total=len(users), desc="Evaluating (sampled)", disable=not show_progress)
+    for start in range(0, len(users), batch_size):
+        block = users[start:start + batch_size]
+        _, block_metrics = _score_block(recommend, test_matrix, block, ks, n_relevant_all, discounts, idcg)
+        for k in ks:
+            for name in METRICS:
+                values[k][name].append(block_metrics[k][name])
+        scored += len(block)
+        progress.update(len(block))
+
+        tracked = np.concatenate(values[ks[-1]][stop_metric])
+        half_width = z * tracked.std(ddof=1) / np.sqrt(scored) if scored > 1 else np.inf
+        if scored >= min_users and half_width <= target_half_width and scored < len(users):
+            stopped_early = True
+            break
+    progress.close()
+
+    results = {"n_users": scored, "stopped_early": stopped_early}
+    for k in ks:
+        results[k] = {}
+        for name in METRICS:
+            metric_values = np.concatenate(values[k][name]) if values[k][name] else np.empty(0)
+            low, high = bootstrap_ci(metric_values, confidence, n_resamples, seed)
+            mean = float(metric_values.mean()) if len(metric_values) else float("nan")
+            results[k][name] = {"mean": mean, "low": low, "high": high}
+    return results
+
+
+def print_sampled_results(results):
+    note = ", stopped at target precision" if results["stopped_early"] else ""
+    print(f"\n📊 Sampled Evaluation Results ({results['n_users']} users{note}):")
+    for k in sorted(key for key in results if isinstance(key, int)):
+        for name, label in (("precision", "Precision"), ("recall", "Recall"), ("ndcg", "NDCG"), ("map", "MAP")):
+            stats = results[k][name]
+            print(f"{label + '@' + str(k) + ':':<14}{stats['mean']:.4f}  [{stats['low']:.4f}, {stats['high']:.4f}]")
+
+
+def run_evaluation(recommend, test_matrix, ks=(10,), train_matrix=None, sampled=False, max_users=None,
+                   strategy="stratified", batch_size=1024, seed=None):
+    """Full evaluate_ranking pass, or with `sampled` an evaluate_sampled run over users
+    stratified by train activity; prints and returns the results."""
+    if not sampled:
+        results = evaluate_ranking(recommend, test_matrix, ks=ks, batch_size=batch_size)
+        print_results(results)
+        return results
+    users = sample_users(test_matrix, activity=train_matrix, strategy=strategy, seed=seed)
+    results = evaluate_sampled(recommend, test_matrix, ks=ks, users=users, batch_size=batch_size,
+                               max_users=max_users, seed=seed)
+    print_sampled_results(results)
+    return results
+
+
+def rating_metrics(predictions, ratings):
+    errors = np.asarray(predictions, dtype=np.float64) - np.asarray(ratings, dtype=np.float64)
+    return {"rmse": float(np.sqrt(np.mean(errors ** 2))), "mae": float(np.mean(np.abs(errors)))}
+
+
+def print_results(results):
+    print("\n📊 Evaluation Results:")
+    for k, metrics in sorted(results.items()):
+        print(f"Precision@{k}: {metrics['precision']:.4f}")
+        print(f"Recall@{k}:    {metrics['recall']:.4f}")
+        print(f"NDCG@{k}:      {metrics['ndcg']:.4f}")
+        print(f"MAP@{k}:       {metrics['map']:.4f}")
+        print(f"Coverage@{k}:  {metrics['coverage']:.4f}")
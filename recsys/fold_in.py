@@ -0,0 +1,164 @@
+import argparse
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from dataset_cache import csr_to_arrays
+from id_index import IdIndex
+from model_registry import ARTIFACT_DIR, interactions_from, load, publish
+from streaming import COLUMNS, dedupe_coo
+
+BATCH_SIZE = 1024
+
+ServingState = namedtuple("ServingState", ["user_factors", "item_factors", "users", "items",
+                                           "interactions", "version"])
+
+
+# ----------------- Least-Squares Fold-In -----------------
+def fold_in(fixed_factors, rows, regularization, alpha=1.0, batch_size=BATCH_SIZE):
+    """Solve ALS factors for each row of `rows` (CSR of confidences) against frozen `fixed_factors`.
+
+    Same normal equations as implicit's ALS step:
+        (YtY + sum_i (c_i - 1) y_i y_i^T + reg I) x = sum_i c_i y_i
+    Right-hand sides come from one sparse product per batch and the systems are
+    solved together with a batched np.linalg.solve.
+    """
+    rows = csr_matrix(rows, dtype=np.float32) * alpha
+    n_factors = fixed_factors.shape[1]
+    YtY = fixed_factors.T @ fixed_factors
+    base = YtY + regularization * np.eye(n_factors, dtype=YtY.dtype)
+    solved = np.empty((rows.shape[0], n_factors), dtype=fixed_factors.dtype)
+
+    for start in range(0, rows.shape[0], batch_size):
+        block = rows[start:start + batch_size]
+        A = np.repeat(base[None, :, :], block.shape[0], axis=0)
+        for row in range(block.shape[0]):
+            items = block.indices[block.indptr[row]:block.indptr[row + 1]]
+            if len(items):
+                confidence = block.data[block.indptr[row]:block.indptr[row + 1]]
+                factors = fixed_factors[items]
+                A[row] += factors.T @ ((confidence - 1.0)[:, None] * factors)
+        b = np.asarray(block @ fixed_factors)
+        solved[start:start + block.shape[0]] = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+    return solved
+
+
+# ----------------- Incremental Updates -----------------
+def _merge_interactions(matrix, rows, cols, values, shape):
+    # Delta entries replace existing (user, item) values; the result stays canonical CSR
+    old = matrix.tocoo()
+    merged_rows, merged_cols, merged_values, _ = dedupe_coo(
+        np.concatenate([old.row, rows]).astype(np.int32),
+        np.concatenate([old.col, cols]).astype(np.int32),
+        np.concatenate([old.data, values]).astype(np.float32),
+        np.zeros(old.nnz + len(rows), dtype=np.int8))
+    return csr_matrix((merged_values, (merged_rows, merged_cols)), shape=shape)
+
+
+class IncrementalUpdater:
+    """Keeps an ALS model fresh between full retrains.
+
+    `apply` appends unseen raw ids, merges a batch of new interactions, re-solves
+    the touched users (and optionally items) against the frozen opposite side,
+    and swaps in a new immutable ServingState. Readers holding the previous
+    state are unaffected; `state` always returns a consistent snapshot.
+    """
+
+    def __init__(self, state, regularization, alpha=1.0, batch_size=BATCH_SIZE):
+        self._state = state
+        self.regularization = regularization
+        self.alpha = alpha
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        return self._state
+
+    def apply(self, raw_users, raw_items, values, update_items=False):
+        with self._lock:
+            state = self._state
+            users = IdIndex(np.array(state.users.raw_ids))
+            items = IdIndex(np.array(state.items.raw_ids))
+            rows = users.extend(raw_users)
+            cols = items.extend(raw_items)
+            shape = (len(users), len(items))
+
+            interactions = _merge_interactions(state.interactions, rows, cols,
+                                               np.asarray(values, dtype=np.float32), shape)
+
+            # New ids start from zero vectors; new items stay unscored unless update_items
+            n_factors = state.user_factors.shape[1]
+            user_factors = np.zeros((shape[0], n_factors), dtype=state.user_factors.dtype)
+            user_factors[:state.user_factors.shape[0]] = state.user_factors
+            item_factors = np.zeros((shape[1], n_factors), dtype=state.item_factors.dtype)
+            item_factors[:state.item_factors.shape[0]] = state.item_factors
+
+            touched_users = np.unique(rows)
+            user_factors[touched_users] = fold_in(item_factors, interactions[touched_users],
+                                                  self.regularization, self.alpha, self.batch_size)
+            if update_items:
+                touched_items = np.unique(cols)
+                item_users = interactions.T.tocsr()
+                item_factors[touched_items] = fold_in(user_factors, item_users[touched_items],
+                                                      self.regularization, self.alpha, self.batch_size)
+
+            # Single reference assignment: the swap is atomic for concurrent readers
+            self._state = ServingState(user_factors, item_factors, users, items, interactions,
+                                       f"{state.version}+{len(touched_users)}u")
+            return self._state
+
+    def publish(self, name, meta=None, artifact_dir=ARTIFACT_DIR):
+        """Publish the current state as a new registry version (factors, id mappings, interactions).
+
+        The merged interactions travel with the version so the next fold-in and
+        seen-item filtering build on them rather than on the original dataset.
+        """
+        state = self._state
+        arrays = {"user_vectors": state.user_factors, "item_vectors": state.item_factors,
+                  **state.users.to_arrays("user_"), **state.items.to_arrays("item_"),
+                  **csr_to_arrays(state.interactions, "interactions_")}
+        return publish(name, arrays, {"parent_version": state.version, "fold_in": True, **(meta or {})},
+                       artifact_dir)
+
+
+# ----------------- CLI -----------------
+def load_state(name="ALS", version=None, artifact_dir=ARTIFACT_DIR):
+    """ServingState from a registry version and the interactions it was fit on."""
+    arrays, meta = load(name, version, mmap=False, artifact_dir=artifact_dir)
+    interactions = interactions_from(arrays, meta)
+    if "user_raw_ids" in arrays:
+        users, items = IdIndex.from_arrays(arrays, "user_"), IdIndex.from_arrays(arrays, "item_")
+    else:
+        # Models trained by train.py keep the dataset layout: row/column i is raw id i + offset
+        offset = meta.get("dataset", {}).get("raw_id_offset", 1)
+        users = IdIndex(np.arange(arrays["user_vectors"].shape[0]) + offset)
+        items = IdIndex(np.arange(arrays["item_vectors"].shape[0]) + offset)
+    state = ServingState(arrays["user_vectors"], arrays["item_vectors"], users, items,
+                         interactions.astype(np.float32), meta["version"])
+    return state, meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold new interactions into the latest ALS model.")
+    parser.add_argument("delta", help="u.data-style TSV of new interactions")
+    parser.add_argument("--model", default="ALS")
+    parser.add_argument("--update-items", action="store_true")
+    args = parser.parse_args()
+
+    state, meta = load_state(args.model)
+    delta = pd.read_csv(args.delta, sep="\t", names=COLUMNS)
+    updater = IncrementalUpdater(state, regularization=meta["params"]["regularization"],
+                                 alpha=meta["params"].get("alpha", 1.0))
+    new_state = updater.apply(delta["user"].to_numpy(), delta["item"].to_numpy(),
+                              delta["rating"].to_numpy(), update_items=args.update_items)
+    print(f"🔄 Folded in {len(delta)} interactions: {len(new_state.users)} users, {len(new_state.items)} items")
+    version = updater.publish(args.model, meta={"params": meta["params"], "dataset": meta["dataset"]})
+    print(f"✅ Published {args.model} version {version}")
+
+
+if __name__ == "__main__":
+    main()
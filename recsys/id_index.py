@@ -0,0 +1,103 @@
+import numpy as np
+
+from dataset_cache import load_arrays, save_arrays
+
+
+class IdIndex:
+    """Raw id <-> dense index mapping backed by NumPy arrays.
+
+    `raw_ids[i]` is the raw id of index i (first-appearance order, as the old
+    dict mappings). A sorted copy with its permutation answers raw -> index
+    lookups for whole batches with one `searchsorted`.
+    """
+
+    def __init__(self, raw_ids):
+        self.raw_ids = np.asarray(raw_ids)
+        self._order = np.argsort(self.raw_ids, kind="stable")
+        self._sorted = self.raw_ids[self._order]
+
+    @classmethod
+    def fit(cls, values):
+        # Returns the index and the dense codes of `values`
+        values = np.asarray(values)
+        _, first = np.unique(values, return_index=True)
+        index = cls(values[np.sort(first)])
+        return index, index.to_index(values)
+
+    def __len__(self):
+        return len(self.raw_ids)
+
+    def __contains__(self, raw):
+        return self.to_index([raw])[0] >= 0
+
+    def __getitem__(self, raw):
+        idx = self.to_index([raw])[0]
+        if idx < 0:
+            raise KeyError(raw)
+        return int(idx)
+
+    def get(self, raw, default=None):
+        idx = self.to_index([raw])[0]
+        return default if idx < 0 else int(idx)
+
+    # ----------------- Bulk Translation -----------------
+    def to_index(self, raw, missing=-1):
+        """Dense indices for an array of raw ids; unseen ids map to `missing`."""
+        raw = np.asarray(raw)
+        if len(self._sorted) == 0:
+            return np.full(raw.shape, missing, dtype=np.int64)
+        pos = np.searchsorted(self._sorted, raw)
+        pos = np.minimum(pos, len(self._sorted) - 1)
+        found = self._sorted[pos] == raw
+        return np.where(found, self._order[pos], missing)
+
+    def to_raw(self, idx):
+        idx = np.asarray(idx)
+        if np.any((idx < 0) | (idx >= len(self.raw_ids))):
+            raise IndexError("Index out of range for this IdIndex")
+        return self.raw_ids[idx]
+
+    def extend(self, raw):
+        """Append unseen ids (in first-appearance order) and return indices for `raw`.
+
+        Only the new ids are sorted; they are merged into the existing sorted
+        arrays with one `searchsorted`, so repeated extends stay linear.
+        """
+        raw = np.asarray(raw)
+        codes = self.to_index(raw)
+        unseen = codes < 0
+        if unseen.any():
+            new_values = raw[unseen]
+            _, first = np.unique(new_values, return_index=True)
+            new_ids = new_values[np.sort(first)]
+            if len(self.raw_ids) == 0:
+                self.__init__(new_ids)
+            else:
+                new_order = np.argsort(new_ids, kind="stable")
+                new_sorted = new_ids[new_order]
+                positions = np.searchsorted(self._sorted, new_sorted)
+                self._sorted = np.insert(self._sorted, positions, new_sorted)
+                self._order = np.insert(self._order, positions, len(self.raw_ids) + new_order)
+                self.raw_ids = np.concatenate([self.raw_ids, new_ids])
+            codes[unseen] = self.to_index(new_values)
+        return codes
+
+    # ----------------- Persistence -----------------
+    def to_arrays(self, prefix=""):
+        return {f"{prefix}raw_ids": self.raw_ids, f"{prefix}order": self._order,
+                f"{prefix}sorted": self._sorted}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix=""):
+        index = cls.__new__(cls)
+        index.raw_ids = arrays[f"{prefix}raw_ids"]
+        index._order = arrays[f"{prefix}order"]
+        index._sorted = arrays[f"{prefix}sorted"]
+        return index
+
+    def save(self, directory):
+        save_arrays(directory, self.to_arrays(), overwrite=True)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        return cls.from_arrays(load_arrays(directory, mmap=mmap))
@@ -2,18 +2,24 @@ import os
 import random
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
 from scipy.sparse import csr_matrix
 from implicit.als import AlternatingLeastSquares
+from splitting import split_csr
+from dataset_cache import load_interactions
+from id_index import IdIndex
+from evaluation import als_recommend_block, negative_sampling_recommend, run_evaluation
+from scoring import als_factors, factor_score_items
+from early_stopping import fit_als, sampled_validator
 
 # Prevent OpenBLAS threading issues
-os.environ["OPENBLAS_NUM_THREADS"] = "1"
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
 
 # ----------------- Parameters -----------------
 K = 10
 FACTORS = 50
 ITERATIONS = 20
 REGULARIZATION = 0.01
+PATIENCE = 3
 
 # ----------------- Load & Preprocess -----------------
 def load_data(path):
@@ -21,96 +27,51 @@ def load_data(path):
     return df
 
 def preprocess(df):
-    user_map = {id: idx for idx, id in enumerate(df['user'].unique())}
-    item_map = {id: idx for idx, id in enumerate(df['item'].unique())}
-
-    df['user_idx'] = df['user'].map(user_map)
-    df['item_idx'] = df['item'].map(item_map)
+    user_map, df['user_idx'] = IdIndex.fit(df['user'].to_numpy())
+    item_map, df['item_idx'] = IdIndex.fit(df['item'].to_numpy())
 
     shape = (len(user_map), len(item_map))
     matrix = csr_matrix((df['rating'], (df['user_idx'], df['item_idx'])), shape=shape)
     return matrix, user_map, item_map
 
-# ----------------- Train/Test Split -----------------
-def train_test_split_implicit(matrix, test_percentage=0.1):
-    matrix = matrix.tolil()
-    train = matrix.copy()
-    test = csr_matrix(matrix.shape)
-
-    for user in range(matrix.shape[0]):
-        items = matrix.rows[user]
-        if len(items) == 0:
-            continue
-        test_size = max(1, int(len(items) * test_percentage))
-        test_items = np.random.choice(items, size=test_size, replace=False)
-        for item in test_items:
-            train[user, item] = 0
-            test[user, item] = matrix[user, item]
-
-    return train.tocsr(), test.tocsr()
-
-# ----------------- Evaluation Metrics -----------------
-def precision_at_k(recommended, actual, k):
-    if not actual:
-        return 0.0
-    return len(set(recommended[:k]) & set(actual)) / k
-
-def recall_at_k(recommended, actual, k):
-    if not actual:
-        return 0.0
-    return len(set(recommended[:k]) & set(actual)) / len(actual)
+def load_matrix(path):
+    # Same output as load_data + preprocess, served from the binary dataset cache
+    data = load_interactions(path)
+    return data.matrix, data.users, data.items
 
-def ndcg_at_k(recommended, actual, k):
-    dcg = 0.0
-    idcg = sum([1.0 / np.log2(i + 2) for i in range(min(len(actual), k))])
-    for i, rec in enumerate(recommended[:k]):
-        if rec in actual:
-            dcg += 1.0 / np.log2(i + 2)
-    return dcg / idcg if idcg > 0 else 0.0
+# ----------------- Train/Test Split -----------------
+def train_test_split_implicit(matrix, test_percentage=0.1, seed=None):
+    return split_csr(matrix, test_percentage=test_percentage, mode="percentage", seed=seed)
 
 # ----------------- Model Evaluation -----------------
-def evaluate(model, train_matrix, test_matrix, k=10):
-    precisions, recalls, ndcgs = [], [], []
-
-    for user in tqdm(range(train_matrix.shape[0]), desc="Evaluating"):
-        actual = test_matrix[user].indices.tolist()
-        if len(actual) == 0:
-            continue
-
-        recommended = model.recommend(
-            userid=user,
-            user_items=train_matrix[user],
-            N=k,
-            filter_already_liked_items=True,
-            recalculate_user=True
-        )
-
-        # ✅ FINAL SAFE FIX
-        recommended_items = [int(row[0]) for row in recommended]
-
-        precisions.append(precision_at_k(recommended_items, actual, k))
-        recalls.append(recall_at_k(recommended_items, actual, k))
-        ndcgs.append(ndcg_at_k(recommended_items, actual, k))
-
-    print("\n📊 Evaluation Results:")
-    print(f"Precision@{k}: {sum(precisions)/len(precisions):.4f}")
-    print(f"Recall@{k}:    {sum(recalls)/len(recalls):.4f}")
-    print(f"NDCG@{k}:      {sum(ndcgs)/len(ndcgs):.4f}")
+def evaluate(model, train_matrix, test_matrix, k=10, ks=None, batch_size=1024, sampled=False,
+             max_users=None, negatives=None, seed=None):
+    # sampled: stratified user sample with bootstrap CIs; negatives: rank test items among N random items
+    if negatives:
+        recommend = negative_sampling_recommend(factor_score_items(als_factors(model)), test_matrix,
+                                                exclude=train_matrix, n_negatives=negatives, seed=seed)
+    else:
+        recommend = als_recommend_block(model, train_matrix)
+    return run_evaluation(recommend, test_matrix, ks=ks or (k,), train_matrix=train_matrix, sampled=sampled,
+                          max_users=max_users, batch_size=batch_size, seed=seed)
 
 # ----------------- Main -----------------
 def main():
     print("📥 Loading and preprocessing data...")
-    df = load_data("u.data")
-    matrix, user_map, item_map = preprocess(df)
+    matrix, user_map, item_map = load_matrix("u.data")
 
     print("🧪 Splitting train/test...")
     train_matrix, test_matrix = train_test_split_implicit(matrix)
+    # Early stopping watches a validation split carved out of the training data
+    fit_matrix, valid_matrix = train_test_split_implicit(train_matrix, seed=0)
 
     print("🧠 Training ALS model...")
     model = AlternatingLeastSquares(factors=FACTORS,
                                     iterations=ITERATIONS,
                                     regularization=REGULARIZATION)
-    model.fit(train_matrix)
+    validate = sampled_validator(als_recommend_block(model, fit_matrix), valid_matrix, k=K)
+    monitor = fit_als(model, fit_matrix, validate, patience=PATIENCE)
+    print(f"🏁 Best epoch {monitor.best_epoch} (val NDCG@{K} {monitor.best_metric:.4f})")
 
     print("✅ Evaluating model...")
     evaluate(model, train_matrix, test_matrix, K)
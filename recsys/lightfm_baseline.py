@@ -1,16 +1,25 @@
 import os
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
 from scipy.sparse import csr_matrix
 from lightfm import LightFM
-from lightfm.evaluation import precision_at_k, recall_at_k
+from splitting import split_csr
+from dataset_cache import load_interactions
+from id_index import IdIndex
+from scoring import factor_recommend_block, factor_score_items, lightfm_factors
+from evaluation import negative_sampling_recommend, run_evaluation
+from early_stopping import fit_lightfm, sampled_validator
 
 # Parameters
 K = 10
 EPOCHS = 20
 NO_COMPONENTS = 50
 LEARNING_RATE = 0.05
+CHUNK_SIZE = 1024
+NUM_THREADS = 4
+# One evaluation batch splits into NUM_THREADS scoring chunks
+EVAL_BATCH_SIZE = CHUNK_SIZE * NUM_THREADS
+PATIENCE = 3
 
 # Load and preprocess
 def load_data(path):
@@ -18,64 +27,52 @@ def load_data(path):
     return df
 
 def preprocess(df):
-    user_map = {id: idx for idx, id in enumerate(df['user'].unique())}
-    item_map = {id: idx for idx, id in enumerate(df['item'].unique())}
-
-    df['user_idx'] = df['user'].map(user_map)
-    df['item_idx'] = df['item'].map(item_map)
+    user_map, df['user_idx'] = IdIndex.fit(df['user'].to_numpy())
+    item_map, df['item_idx'] = IdIndex.fit(df['item'].to_numpy())
 
     shape = (len(user_map), len(item_map))
     matrix = csr_matrix((df['rating'], (df['user_idx'], df['item_idx'])), shape=shape)
     return matrix, user_map, item_map
 
-def train_test_split(matrix, test_percentage=0.1):
-    matrix = matrix.tolil()
-    train = matrix.copy()
-    test = csr_matrix(matrix.shape)
-
-    for user in range(matrix.shape[0]):
-        items = matrix.rows[user]
-        if len(items) == 0:
-            continue
-        test_size = max(1, int(len(items) * test_percentage))
-        test_items = np.random.choice(items, size=test_size, replace=False)
-        for item in test_items:
-            train[user, item] = 0
-            test[user, item] = matrix[user, item]
+def load_matrix(path):
+    # Same output as load_data + preprocess, served from the binary dataset cache
+    data = load_interactions(path)
+    return data.matrix, data.users, data.items
 
-    return train.tocsr(), test.tocsr()
+def train_test_split(matrix, test_percentage=0.1, seed=None):
+    return split_csr(matrix, test_percentage=test_percentage, mode="percentage", seed=seed)
 
-def evaluate(model, train_matrix, test_matrix, k):
-    print("\n📊 Evaluation Results:")
-    precision = precision_at_k(model, test_matrix, train_interactions=train_matrix, k=k).mean()
-    recall = recall_at_k(model, test_matrix, train_interactions=train_matrix, k=k).mean()
-    
-    # Manual NDCG@k
-    ndcgs = []
-    for user in tqdm(range(test_matrix.shape[0]), desc="Calculating NDCG"):
-        scores = model.predict(user, np.arange(test_matrix.shape[1]))
-        top_k = np.argsort(-scores)[:k]
-        actual = test_matrix[user].indices
-        dcg = sum([1.0 / np.log2(i + 2) for i, item in enumerate(top_k) if item in actual])
-        idcg = sum([1.0 / np.log2(i + 2) for i in range(min(len(actual), k))])
-        ndcg = dcg / idcg if idcg > 0 else 0.0
-        ndcgs.append(ndcg)
-
-    print(f"Precision@{k}: {precision:.4f}")
-    print(f"Recall@{k}:    {recall:.4f}")
-    print(f"NDCG@{k}:      {np.mean(ndcgs):.4f}")
+def evaluate(model, train_matrix, test_matrix, k, ks=None, sampled=False, max_users=None, negatives=None,
+             seed=None):
+    # Score chunks of users against all items at once, training items masked out
+    factors = lightfm_factors(model)
+    if negatives:
+        recommend = negative_sampling_recommend(factor_score_items(factors), test_matrix,
+                                                exclude=train_matrix.tocsr(), n_negatives=negatives, seed=seed)
+    else:
+        recommend = factor_recommend_block(factors, exclude=train_matrix.tocsr(),
+                                           chunk_size=CHUNK_SIZE, num_threads=NUM_THREADS)
+    return run_evaluation(recommend, test_matrix, ks=ks or (k,), train_matrix=train_matrix, sampled=sampled,
+                          max_users=max_users, batch_size=EVAL_BATCH_SIZE, seed=seed)
 
 def main():
     print("📥 Loading and preprocessing data...")
-    df = load_data("u.data")
-    matrix, user_map, item_map = preprocess(df)
+    matrix, user_map, item_map = load_matrix("u.data")
 
     print("🧪 Splitting train/test...")
     train_matrix, test_matrix = train_test_split(matrix)
+    # Early stopping watches a validation split carved out of the training data
+    fit_matrix, valid_matrix = train_test_split(train_matrix, seed=0)
 
     print("🧠 Training LightFM model...")
     model = LightFM(no_components=NO_COMPONENTS, loss='warp', learning_rate=LEARNING_RATE)
-    model.fit(train_matrix, epochs=EPOCHS, num_threads=4)
+
+    def recommend(users, k):
+        # Representations are re-read on every call so validation follows each epoch
+        return factor_recommend_block(lightfm_factors(model), exclude=fit_matrix, chunk_size=CHUNK_SIZE)(users, k)
+    validate = sampled_validator(recommend, valid_matrix, k=K)
+    monitor = fit_lightfm(model, fit_matrix, validate, EPOCHS, num_threads=NUM_THREADS, patience=PATIENCE)
+    print(f"🏁 Best epoch {monitor.best_epoch} (val NDCG@{K} {monitor.best_metric:.4f})")
 
     print("✅ Evaluating model...")
     evaluate(model, train_matrix, test_matrix, K)
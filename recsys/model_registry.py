@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import time
+import uuid
+
+from dataset_cache import arrays_to_csr, load_arrays, save_arrays
+
+ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts")
+FACTOR_NAMES = ("user_vectors", "item_vectors", "user_biases", "item_biases")
+
+
+class ModelNotFound(LookupError):
+    pass
+
+
+# ----------------- Versions -----------------
+def model_dir(name, artifact_dir=ARTIFACT_DIR):
+    return os.path.join(artifact_dir, name.lower())
+
+
+def list_versions(name, artifact_dir=ARTIFACT_DIR):
+    directory = model_dir(name, artifact_dir)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(entry for entry in os.listdir(directory)
+                  if not entry.startswith(".") and os.path.isfile(os.path.join(directory, entry, "meta.json")))
+
+
+def latest_version(name, artifact_dir=ARTIFACT_DIR):
+    try:
+        with open(os.path.join(model_dir(name, artifact_dir), "LATEST")) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        raise ModelNotFound(f"No published version of {name!r} in {artifact_dir}") from None
+
+
+# ----------------- Publish / Load -----------------
+def publish(name, arrays, meta=None, artifact_dir=ARTIFACT_DIR):
+    """Write a new immutable version of `name` and point LATEST at it.
+
+    The version directory is renamed into place before LATEST is swapped, so a
+    reader either sees the previous version or the complete new one.
+    """
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    directory = model_dir(name, artifact_dir)
+    meta = {"model": name, "version": version, "created": time.time(), **(meta or {})}
+    save_arrays(os.path.join(directory, version), arrays, meta=meta)
+
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".LATEST-")
+    with os.fdopen(fd, "w") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(directory, "LATEST"))
+    return version
+
+
+def load(name, version=None, mmap=True, artifact_dir=ARTIFACT_DIR):
+    """Arrays and metadata of a version (default LATEST), memory-mapped by default."""
+    version = version or latest_version(name, artifact_dir)
+    directory = os.path.join(model_dir(name, artifact_dir), version)
+    if not os.path.isdir(directory):
+        raise ModelNotFound(f"{name!r} has no version {version!r}")
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    return load_arrays(directory, mmap=mmap), meta
+
+
+# ----------------- Factor Models -----------------
+def publish_factors(name, factors, meta=None, artifact_dir=ARTIFACT_DIR, ann=True):
+    """Publish (user_vectors, item_vectors, user_biases, item_biases) as returned by scoring.
+
+    With `ann` an IVF index over the (bias-augmented) item vectors is built and
+    stored in the same version under the "ann_" prefix.
+    """
+    arrays = {key: value for key, value in zip(FACTOR_NAMES, factors) if value is not None}
+    meta = dict(meta or {})
+    if ann:
+        from ann import IVFIndex, with_biases
+
+        _, item_vectors = with_biases(*factors)
+        index = IVFIndex.build(item_vectors, seed=0)
+        arrays.update(index.to_arrays("ann_"))
+        meta["ann"] = {"n_lists": index.n_lists, "nprobe": index.nprobe}
+    return publish(name, arrays, meta, artifact_dir)
+
+
+def load_factors(name, version=None, mmap=True, artifact_dir=ARTIFACT_DIR):
+    arrays, meta = load(name, version, mmap, artifact_dir)
+    return tuple(arrays.get(key) for key in FACTOR_NAMES), meta
+
+
+def ann_index_from(arrays, meta):
+    # IVF index published with the factors, None for versions without one
+    if "ann" not in meta:
+        return None
+    from ann import IVFIndex
+
+    return IVFIndex.from_arrays(arrays, "ann_", meta["ann"]["nprobe"])
+
+
+# ----------------- Interactions -----------------
+def interactions_from(arrays, meta):
+    """Interaction CSR a version was fit on, with rows aligned to its user factors.
+
+    Fold-in versions carry their merged matrix under the "interactions_" prefix;
+    versions from train.py name their training dataset in meta instead.
+    """
+    if "interactions_indptr" in arrays:
+        return arrays_to_csr(arrays, "interactions_")
+    from dataset_cache import load_movielens
+
+    train, _, _ = load_movielens(min_rating=meta.get("dataset", {}).get("min_rating", 4.0))
+    return train
+
+
+def load_interactions(name, version=None, mmap=True, artifact_dir=ARTIFACT_DIR):
+    arrays, meta = load(name, version, mmap, artifact_dir)
+    return interactions_from(arrays, meta), meta
@@ -1,11 +1,23 @@
+import os
+import sys
+import numpy as np
 import pandas as pd
+from scipy.sparse import csr_matrix
 from surprise import Dataset, Reader, SVD
 from surprise.model_selection import train_test_split
-from surprise.accuracy import rmse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from id_index import IdIndex
+from scoring import svd_factors, svd_global_mean, predict_ratings, predict_catalogue, factor_recommend_block
+from evaluation import rating_metrics, evaluate_ranking, print_results
+
+K = 10
 
 # 1. Load the dataset
 print("📦 Loading data...")
 df = pd.read_csv('../data/ml-100k/u.data', sep='\t', names=['userId', 'itemId', 'rating', 'timestamp'])
+users, _ = IdIndex.fit(df['userId'].to_numpy())
+items, _ = IdIndex.fit(df['itemId'].to_numpy())
 
 # 2. Prepare the dataset for Surprise
 reader = Reader(rating_scale=(1, 5))
@@ -21,14 +33,39 @@ model = SVD()
 model.fit(trainset)
 
 # 5. Evaluate the model
+# Factors are aligned to the dense user/item indices, so the whole test set is
+# predicted with one vectorized pass instead of model.test() pair by pair
 print("📊 Evaluating on test set...")
-predictions = model.test(testset)
+factors = svd_factors(model, users.raw_ids, items.raw_ids)
+test_users = users.to_index([uid for uid, _, _ in testset])
+test_items = items.to_index([iid for _, iid, _ in testset])
+test_ratings = np.array([r for _, _, r in testset])
+predictions = predict_ratings(factors, test_users, test_items, svd_global_mean(model), trainset.rating_scale)
 
 # 6. Calculate RMSE
-error = rmse(predictions)
-print(f"✅ RMSE: {error:.4f}")
+errors = rating_metrics(predictions, test_ratings)
+print(f"✅ RMSE: {errors['rmse']:.4f}")
+print(f"✅ MAE:  {errors['mae']:.4f}")
 
-# 7. Show a few predictions
+# 7. Rank the full catalogue, training items masked out
+print("🏆 Ranking evaluation...")
+train_pairs = [(trainset.to_raw_uid(u), trainset.to_raw_iid(i)) for u, i, _ in trainset.all_ratings()]
+shape = (len(users), len(items))
+train_matrix = csr_matrix((np.ones(len(train_pairs)), (users.to_index([u for u, _ in train_pairs]),
+                                                       items.to_index([i for _, i in train_pairs]))), shape=shape)
+test_matrix = csr_matrix((test_ratings, (test_users, test_items)), shape=shape)
+print_results(evaluate_ranking(factor_recommend_block(factors, exclude=train_matrix), test_matrix, ks=(K,)))
+
+# 8. Show a few predictions
 print("\n🔮 Sample predictions:")
-for pred in predictions[:5]:
-    print(f"User {pred.uid} - Item {pred.iid} | Actual: {pred.r_ui}, Predicted: {pred.est:.2f}")
+for (uid, iid, r_ui), est in list(zip(testset, predictions))[:5]:
+    print(f"User {uid} - Item {iid} | Actual: {r_ui}, Predicted: {est:.2f}")
+
+# 9. Highest predicted ratings among unseen items, the catalogue scored in user chunks
+print("\n⭐ Top predicted ratings:")
+sample_users = np.arange(3)
+ratings = predict_catalogue(factors, sample_users, svd_global_mean(model), trainset.rating_scale,
+                            exclude=train_matrix)
+for user, row in zip(sample_users, ratings):
+    best = np.argsort(-np.nan_to_num(row, nan=-np.inf))[:3]
+    print(f"User {users.to_raw(user)} | " + ", ".join(f"Item {items.to_raw(i)}: {row[i]:.2f}" for i in best))
@@ -1,12 +1,22 @@
 import os
+import sys
 import pandas as pd
 import numpy as np
 import scipy.sparse as sp
 from implicit.als import AlternatingLeastSquares
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from splitting import split_csr
+from dataset_cache import load_interactions
+from id_index import IdIndex
+from evaluation import als_recommend_block, run_evaluation
+
 # Avoid OpenBLAS threading issue
-os.environ["OPENBLAS_NUM_THREADS"] = "1"
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+
+# Set to e.g. 2000 to evaluate a stratified user sample with bootstrap CIs
+SAMPLE_USERS = None
 
 # Load dataset
 def load_data(path):
@@ -15,33 +25,23 @@ def load_data(path):
 
 # Create sparse interaction matrix (binarized)
 def create_interaction_matrix(df):
-    user_mapper = {u: i for i, u in enumerate(df['user_id'].unique())}
-    item_mapper = {i: j for j, i in enumerate(df['item_id'].unique())}
-    user_inverse_mapper = {i: u for u, i in user_mapper.items()}
-
-    user_index = df['user_id'].map(user_mapper)
-    item_index = df['item_id'].map(item_mapper)
+    user_mapper, user_index = IdIndex.fit(df['user_id'].to_numpy())
+    # IdIndex translates both ways: mapper[raw] -> index, mapper.to_raw(index) -> raw
+    item_mapper, item_index = IdIndex.fit(df['item_id'].to_numpy())
 
     # Binarize the ratings for implicit feedback
     interactions = sp.coo_matrix((np.ones(len(df)), (user_index, item_index)))
-    return interactions.tocsr(), user_mapper, item_mapper, user_inverse_mapper
+    return interactions.tocsr(), user_mapper, item_mapper
+
+# Cached equivalent of load_data + create_interaction_matrix
+def load_interaction_matrix(path):
+    data = load_interactions(path, binarize=True)
+    return data.matrix, data.users, data.items
 
 # Train-test split
 def train_test_split_sparse(matrix, seed=42):
-    np.random.seed(seed)
-    train_matrix = matrix.copy().tolil()
-    test_matrix = sp.lil_matrix(matrix.shape)
-
-    for user in range(matrix.shape[0]):
-        items = matrix[user].indices
-        if len(items) < 2:
-            continue
-        test_item = np.random.choice(items)
-        train_matrix[user, test_item] = 0
-        test_matrix[user, test_item] = 1
-
-    train_matrix = train_matrix.tocsr()
-    test_matrix = test_matrix.tocsr()
+    # Leave one random interaction out for every user with at least two
+    train_matrix, test_matrix = split_csr(matrix, mode="leave_one_out", min_items=2, seed=seed)
     print(f"✅ Train interactions: {train_matrix.nnz}, Test interactions: {test_matrix.nnz}")
     return train_matrix, test_matrix
 
@@ -54,27 +54,18 @@ def precision_at_k(model, train_mat, test_mat, k=10):
         if len(test_items) == 0:
             continue
 
-        try:
-            recommended = model.recommend(user_id, train_mat, N=k, filter_already_liked_items=True)
-            recommended_items = [item for item, _ in recommended]
-
-            if not recommended_items:
-                continue
-
-            hits = len(set(recommended_items) & set(test_items))
-            precisions.append(hits / k)
-        except:
-            continue
+        # implicit >= 0.5 takes the user's own row and returns (ids, scores) arrays
+        recommended_items, _ = model.recommend(user_id, train_mat[user_id], N=k, filter_already_liked_items=True)
+        hits = len(set(recommended_items.tolist()) & set(test_items.tolist()))
+        precisions.append(hits / k)
 
     return np.mean(precisions) if precisions else 0.0
 
 # Main execution
 if __name__ == "__main__":
-    print("📥 Loading data...")
-    df = load_data("~/Desktop/recsys/data/ml-100k/u.data")
-
-    print("📊 Creating interaction matrix...")
-    matrix, user_mapper, item_mapper, user_inverse_mapper = create_interaction_matrix(df)
+    print("📥 Loading data and creating interaction matrix...")
+    matrix, user_mapper, item_mapper = load_interaction_matrix(
+        "~/Desktop/recsys/data/ml-100k/u.data")
     print(f"✅ User-Item matrix shape: {matrix.shape}")
 
     print("🧪 Splitting train and test...")
@@ -85,5 +76,10 @@ if __name__ == "__main__":
     model.fit(train_matrix.T)  # Don't convert to CSC, implicit will do that
 
     print("📈 Evaluating model...")
-    precision = precision_at_k(model, train_matrix, test_matrix, k=10)
-    print(f"\n🎯 Precision@10: {precision:.4f}")
+    if SAMPLE_USERS:
+        # Stratified user sample, batched recommend calls and bootstrap CIs
+        run_evaluation(als_recommend_block(model, train_matrix), test_matrix, train_matrix=train_matrix,
+                       sampled=True, max_users=SAMPLE_USERS, seed=42)
+    else:
+        precision = precision_at_k(model, train_matrix, test_matrix, k=10)
+        print(f"\n🎯 Precision@10: {precision:.4f}")
@@ -0,0 +1,64 @@
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from tqdm import tqdm
+
+from model_registry import load_factors, load_interactions
+from scoring import top_k_scores
+from topn_store import TopNWriter
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outputs")
+N = 50
+CHUNK_SIZE = 1024
+NUM_THREADS = 4
+
+
+def store_path(model_name, output_dir=OUTPUT_DIR):
+    return os.path.join(output_dir, f"topn_{model_name.lower()}.bin")
+
+
+# ----------------- Precompute -----------------
+def precompute(factors, exclude, path, model_version, n=N, chunk_size=CHUNK_SIZE,
+               num_threads=NUM_THREADS, meta=None):
+    """Score every user in chunks on a thread pool and stream the top-n into a store."""
+    user_vectors, item_vectors, user_biases, item_biases = factors
+    n_users = user_vectors.shape[0]
+    n = min(n, item_vectors.shape[0])
+    writer = TopNWriter(path, n_users, n, model_version, meta)
+
+    def run(start):
+        users = np.arange(start, min(start + chunk_size, n_users))
+        ids, scores = top_k_scores(user_vectors, item_vectors, users, n, user_biases, item_biases,
+                                   exclude=exclude, chunk_size=chunk_size)
+        writer.write(start, ids, scores)
+
+    starts = range(0, n_users, chunk_size)
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        list(tqdm(pool.map(run, starts), total=len(starts), desc=f"Top-{n}"))
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute top-N recommendations for every user.")
+    parser.add_argument("--models", nargs="+", default=["ALS", "LightFM"], choices=["ALS", "LightFM"])
+    parser.add_argument("--n", type=int, default=N)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--threads", type=int, default=NUM_THREADS)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    for name in args.models:
+        # Scores the latest published version; the store header records which one
+        factors, meta = load_factors(name)
+        # Seen items of that same version, so fold-in versions exclude their merged interactions
+        seen, _ = load_interactions(name, meta["version"])
+        path = store_path(name, args.output_dir)
+        print(f"💾 Writing {name} {meta['version']} top-{args.n} for {seen.shape[0]} users to {path}...")
+        precompute(factors, seen, path, meta["version"], n=args.n, chunk_size=args.chunk_size,
+                   num_threads=args.threads, meta={"model": name})
+
+
+if __name__ == "__main__":
+    main()
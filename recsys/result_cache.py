@@ -0,0 +1,160 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+ENTRY_OVERHEAD = 256  # rough per-entry bytes for the key, tuple and dict slot
+
+
+class RecommendationCache:
+    """LRU/TTL cache of (item ids, scores) keyed by (model version, user, n, filters).
+
+    Memory use is bounded by `max_bytes` (array bytes plus a fixed per-entry
+    overhead). Seeing a new version for a model drops everything cached for its
+    older versions. With `disk_dir`, entries are also written as .npy pairs under
+    <disk_dir>/<model>/<version>/ so several worker processes can share them.
+    """
+
+    def __init__(self, max_bytes=64 << 20, ttl=None, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(
+            ["hits", "misses", "disk_hits", "evictions", "expirations", "invalidations"], 0)
+
+    @staticmethod
+    def make_key(model, version, user, n, filters=()):
+        return (model, version, int(user), int(n), tuple(filters))
+
+    # ----------------- Lookup -----------------
+    def get(self, model, version, user, n, filters=()):
+        key = self.make_key(model, version, user, n, filters)
+        with self._lock:
+            self._check_version(model, version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, size, created = entry
+                if self._expired(created):
+                    self._drop(key)
+                    self.counters["expirations"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return value
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+            self._insert(key, value)
+        return value
+
+    def put(self, model, version, user, n, filters, value):
+        key = self.make_key(model, version, user, n, filters)
+        value = tuple(np.asarray(array) for array in value)
+        with self._lock:
+            self._check_version(model, version)
+            self._insert(key, value)
+        self._disk_put(key, value)
+
+    def get_or_compute(self, model, version, user, n, filters, compute):
+        value = self.get(model, version, user, n, filters)
+        if value is None:
+            value = compute()
+            self.put(model, version, user, n, filters, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hit_rate = (self.counters["hits"] + self.counters["disk_hits"]) / lookups if lookups else 0.0
+            return {**self.counters, "entries": len(self._entries), "bytes": self._bytes,
+                    "hit_rate": hit_rate}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # ----------------- Internals (called with the lock held) -----------------
+    def _expired(self, created):
+        return self.ttl is not None and time.monotonic() - created > self.ttl
+
+    def _check_version(self, model, version):
+        current = self._versions.get(model)
+        if current == version:
+            return
+        self._versions[model] = version
+        if current is None:
+            return
+        stale = [key for key in self._entries if key[0] == model and key[1] != version]
+        for key in stale:
+            self._drop(key)
+        self.counters["invalidations"] += len(stale)
+        if self.disk_dir:
+            self._disk_prune(model, version)
+
+    def _insert(self, key, value):
+        size = sum(array.nbytes for array in value) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (value, size, time.monotonic())
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.counters["evictions"] += 1
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    # ----------------- Shared disk tier -----------------
+    def _disk_path(self, key):
+        model, version = key[0], key[1]
+        digest = hashlib.sha1(repr(key[2:]).encode()).hexdigest()
+        return os.path.join(self.disk_dir, model.lower(), str(version), digest)
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path + ".ids.npy") > self.ttl:
+                return None
+            return np.load(path + ".ids.npy"), np.load(path + ".scores.npy")
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Scores first, ids last: a reader that finds the ids file finds both
+        for suffix, array in ((".scores.npy", value[1]), (".ids.npy", value[0])):
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, array, allow_pickle=False)
+            os.replace(tmp, path + suffix)
+
+    def _disk_prune(self, model, version):
+        directory = os.path.join(self.disk_dir, model.lower())
+        if not os.path.isdir(directory):
+            return
+        for entry in os.listdir(directory):
+            if entry != str(version):
+                shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
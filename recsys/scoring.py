@@ -0,0 +1,176 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+# ----------------- Representations -----------------
+def lightfm_factors(model, user_features=None, item_features=None):
+    # LightFM scores are dot(user_repr, item_repr) + user_bias + item_bias
+    user_biases, user_vectors = model.get_user_representations(user_features)
+    item_biases, item_vectors = model.get_item_representations(item_features)
+    return user_vectors, item_vectors, user_biases, item_biases
+
+
+def als_factors(model):
+    # GPU models keep their factors on the device; bring them back as NumPy
+    if hasattr(model, "to_cpu"):
+        model = model.to_cpu()
+    return model.user_factors, model.item_factors, None, None
+
+
+def svd_factors(model, user_ids=None, item_ids=None):
+    """(pu, qi, bu, bi) of a trained Surprise SVD.
+
+    Rows follow Surprise's inner ids unless raw `user_ids` / `item_ids` are
+    given, in which case row i belongs to user_ids[i] and ids the model never
+    saw get zero vectors and biases (Surprise's own fallback for unknowns).
+    """
+    trainset = model.trainset
+    user_vectors, item_vectors = model.pu, model.qi
+    # Unbiased SVD predicts pu . qi alone, so there are no biases to add
+    user_biases, item_biases = (model.bu, model.bi) if model.biased else (None, None)
+
+    def align(vectors, biases, raw2inner, raw_ids):
+        if raw_ids is None:
+            return vectors, biases
+        inner = np.array([raw2inner.get(raw, -1) for raw in np.asarray(raw_ids).tolist()], dtype=np.int64)
+        # Index -1 lands on the appended zero row
+        return (np.vstack([vectors, np.zeros((1, vectors.shape[1]))])[inner],
+                None if biases is None else np.append(biases, 0.0)[inner])
+
+    user_vectors, user_biases = align(user_vectors, user_biases, trainset._raw2inner_id_users, user_ids)
+    item_vectors, item_biases = align(item_vectors, item_biases, trainset._raw2inner_id_items, item_ids)
+    return user_vectors, item_vectors, user_biases, item_biases
+
+
+def svd_global_mean(model):
+    # Surprise adds the global mean only for biased SVD
+    return model.trainset.global_mean if model.biased else 0.0
+
+
+def factor_score_items(factors):
+    # Adapter for evaluation.negative_sampling_recommend: scores a (users, candidates) id array
+    user_vectors, item_vectors, user_biases, item_biases = factors
+
+    def score_items(users, items):
+        scores = np.einsum("uf,ucf->uc", user_vectors[users], item_vectors[items])
+        if item_biases is not None:
+            scores += item_biases[items]
+        if user_biases is not None:
+            scores += user_biases[users][:, None]
+        return scores
+    return score_items
+
+
+# ----------------- Rating Prediction -----------------
+def predict_ratings(factors, users, items, global_mean=0.0, rating_scale=None, chunk_size=1 << 20):
+    """Ratings for (users[i], items[i]) pairs: mean + bu + bi + pu . qi, clipped to `rating_scale`.
+
+    Pairs are processed `chunk_size` at a time so the gathered factor rows stay bounded.
+    """
+    user_vectors, item_vectors, user_biases, item_biases = factors
+    users = np.asarray(users, dtype=np.int64)
+    items = np.asarray(items, dtype=np.int64)
+    predictions = np.empty(len(users), dtype=np.float64)
+    for start in range(0, len(users), chunk_size):
+        u, i = users[start:start + chunk_size], items[start:start + chunk_size]
+        block = np.einsum("ij,ij->i", user_vectors[u], item_vectors[i]) + global_mean
+        if user_biases is not None:
+            block += user_biases[u]
+        if item_biases is not None:
+            block += item_biases[i]
+        predictions[start:start + len(u)] = block
+    if rating_scale is not None:
+        np.clip(predictions, *rating_scale, out=predictions)
+    return predictions
+
+
+def predict_catalogue(factors, users, global_mean=0.0, rating_scale=None, exclude=None, chunk_size=1024):
+    """Predicted ratings of `users` against the whole catalogue, (len(users), n_items).
+
+    Each chunk of `chunk_size` users is mean + bu + bi + P @ Q.T, clipped to
+    `rating_scale`; items in the `exclude` CSR come out as NaN.
+    """
+    user_vectors, item_vectors, user_biases, item_biases = factors
+    users = np.asarray(users, dtype=np.int64)
+    predictions = np.empty((len(users), item_vectors.shape[0]), dtype=np.float64)
+    for start in range(0, len(users), chunk_size):
+        block = users[start:start + chunk_size]
+        scores = score_block(user_vectors, item_vectors, block, user_biases, item_biases) + global_mean
+        if rating_scale is not None:
+            np.clip(scores, *rating_scale, out=scores)
+        if exclude is not None:
+            seen = exclude[block]
+            scores[np.repeat(np.arange(len(block)), np.diff(seen.indptr)), seen.indices] = np.nan
+        predictions[start:start + len(block)] = scores
+    return predictions
+
+
+# ----------------- Top-K -----------------
+def top_k_rows(scores, k):
+    if k >= scores.shape[1]:
+        top = np.argsort(-scores, axis=1)
+    else:
+        # argpartition selects the k best in linear time, only those get sorted
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        part_scores = np.take_along_axis(scores, part, axis=1)
+        top = np.take_along_axis(part, np.argsort(-part_scores, axis=1), axis=1)
+    return top, np.take_along_axis(scores, top, axis=1)
+
+
+def score_block(user_vectors, item_vectors, users, user_biases=None, item_biases=None,
+                exclude=None):
+    scores = user_vectors[users] @ item_vectors.T
+    if item_biases is not None:
+        scores += item_biases
+    if user_biases is not None:
+        scores += user_biases[users][:, None]
+    if exclude is not None:
+        seen = exclude[users]
+        rows = np.repeat(np.arange(len(users)), np.diff(seen.indptr))
+        scores[rows, seen.indices] = -np.inf
+    return scores
+
+
+def top_k_scores(user_vectors, item_vectors, users, k, user_biases=None, item_biases=None,
+                 exclude=None, chunk_size=1024, num_threads=1):
+    """Top-k item ids and scores for `users`, scored in chunks of `chunk_size` users.
+
+    Each chunk is one dense (chunk, n_items) matrix product; items present in the
+    `exclude` CSR (typically the train matrix) are masked before selection.
+    Chunks run on `num_threads` threads since the BLAS product releases the GIL.
+    """
+    users = np.asarray(users, dtype=np.int64)
+    k = min(k, item_vectors.shape[0])
+    ids = np.empty((len(users), k), dtype=np.int32)
+    scores = np.empty((len(users), k), dtype=np.float32)
+
+    def run(start):
+        block = users[start:start + chunk_size]
+        block_scores = score_block(user_vectors, item_vectors, block, user_biases, item_biases, exclude)
+        top, top_scores = top_k_rows(block_scores, k)
+        ids[start:start + len(block)] = top
+        scores[start:start + len(block)] = top_scores
+
+    starts = range(0, len(users), chunk_size)
+    if num_threads > 1:
+        with ThreadPoolExecutor(max_workers=num_threads) as pool:
+            list(pool.map(run, starts))
+    else:
+        for start in starts:
+            run(start)
+
+    # Masked items that still made the cut (k > unseen items) are reported as padding
+    ids[~np.isfinite(scores)] = -1
+    return ids, scores
+
+
+def factor_recommend_block(factors, exclude=None, chunk_size=1024, num_threads=1):
+    # Adapter for evaluation.evaluate_ranking
+    user_vectors, item_vectors, user_biases, item_biases = factors
+
+    def recommend(users, k):
+        ids, _ = top_k_scores(user_vectors, item_vectors, users, k, user_biases, item_biases,
+                              exclude=exclude, chunk_size=chunk_size, num_threads=num_threads)
+        return ids
+    return recommend
@@ -0,0 +1,86 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+SPLIT_MODES = ("percentage", "leave_one_out", "temporal")
+
+
+# ----------------- Helpers -----------------
+def _row_ids(indptr):
+    counts = np.diff(indptr)
+    return np.repeat(np.arange(len(counts), dtype=np.int32), counts), counts
+
+
+def _rank_within_rows(indptr, rows, keys):
+    # Position of each nonzero inside its own row once the row is ordered by `keys`
+    order = np.lexsort((keys, rows))
+    ranks = np.empty(len(rows), dtype=np.int64)
+    ranks[order] = np.arange(len(rows)) - indptr[rows[order]]
+    return ranks
+
+
+def _subset(matrix, rows, mask):
+    counts = np.bincount(rows[mask], minlength=matrix.shape[0])
+    indptr = np.zeros(matrix.shape[0] + 1, dtype=matrix.indptr.dtype)
+    np.cumsum(counts, out=indptr[1:])
+    return csr_matrix((matrix.data[mask], matrix.indices[mask], indptr), shape=matrix.shape)
+
+
+# ----------------- Train/Test Split -----------------
+def split_csr(matrix, test_percentage=0.1, mode="percentage", timestamps=None,
+              min_items=1, seed=None):
+    """Per-user holdout computed directly on the CSR arrays.
+
+    percentage     -> max(1, int(n * test_percentage)) random items per user
+    leave_one_out  -> one random item per user
+    temporal       -> same count as `percentage`, but the most recent items by
+                      `timestamps` (a CSR matrix with the same sparsity pattern)
+
+    Users with fewer than `min_items` interactions keep everything in train.
+    """
+    if mode not in SPLIT_MODES:
+        raise ValueError(f"Unknown split mode {mode!r}, expected one of {SPLIT_MODES}")
+
+    matrix = csr_matrix(matrix, copy=True)
+    matrix.sum_duplicates()
+    matrix.eliminate_zeros()
+    rows, counts = _row_ids(matrix.indptr)
+
+    if mode == "temporal":
+        if timestamps is None:
+            raise ValueError("Temporal split needs a timestamps matrix")
+        timestamps = csr_matrix(timestamps)
+        timestamps.sum_duplicates()
+        if timestamps.shape != matrix.shape or timestamps.nnz != matrix.nnz \
+                or not np.array_equal(timestamps.indices, matrix.indices):
+            raise ValueError("Timestamps must share the interaction matrix sparsity pattern")
+        # Newest first so the lowest ranks are the held-out items
+        keys = -timestamps.data.astype(np.float64)
+    else:
+        keys = np.random.default_rng(seed).random(matrix.nnz)
+
+    if mode == "leave_one_out":
+        test_sizes = np.ones_like(counts)
+    else:
+        test_sizes = np.maximum(1, (counts * test_percentage).astype(counts.dtype))
+    test_sizes[counts < max(min_items, 1)] = 0
+
+    in_test = _rank_within_rows(matrix.indptr, rows, keys) < test_sizes[rows]
+    return _subset(matrix, rows, ~in_test), _subset(matrix, rows, in_test)
+
+
+def timestamp_matrix(df, shape, user_col="user_idx", item_col="item_idx", time_col="timestamp"):
+    return csr_matrix((df[time_col].to_numpy(), (df[user_col].to_numpy(), df[item_col].to_numpy())),
+                      shape=shape)
+
+
+def kfold_csr(matrix, k=5, seed=None):
+    """Split the nonzeros into `k` disjoint random folds, like ml-100k's u1..u5.
+
+    Returns a list of (train, test) pairs; every interaction is in exactly one test fold.
+    """
+    matrix = csr_matrix(matrix, copy=True)
+    matrix.sum_duplicates()
+    rows, _ = _row_ids(matrix.indptr)
+    folds = np.random.default_rng(seed).permutation(matrix.nnz) % k
+    return [(_subset(matrix, rows, folds != fold), _subset(matrix, rows, folds == fold))
+            for fold in range(k)]
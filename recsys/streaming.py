@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from dataset_cache import Interactions
+from id_index import IdIndex
+
+COLUMNS = ["user", "item", "rating", "timestamp"]
+DTYPES = {"user": np.int64, "item": np.int64, "rating": np.float32, "timestamp": np.int64}
+
+
+# ----------------- Deduplication -----------------
+def dedupe_coo(rows, cols, data, timestamps):
+    # Stable sort by (row, col) keeps file order inside a pair; the last occurrence wins
+    order = np.lexsort((cols, rows))
+    rows, cols, data, timestamps = rows[order], cols[order], data[order], timestamps[order]
+    last = np.ones(len(rows), dtype=bool)
+    last[:-1] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+    return rows[last], cols[last], data[last], timestamps[last]
+
+
+def _merge(parts):
+    return dedupe_coo(*(np.concatenate(column) for column in zip(*parts)))
+
+
+# ----------------- Streaming Loader -----------------
+def read_interactions(path, chunksize=1_000_000, min_rating=None, binarize=False,
+                      buffer_size=10_000_000, sep="\t"):
+    """Build the interaction CSR from a u.data-style log without loading it whole.
+
+    The file is parsed `chunksize` rows at a time with int32 indices and float32
+    values. Chunks are buffered as COO triples and folded into a deduplicated,
+    sorted accumulator every `buffer_size` rows, so peak memory stays around the
+    size of the final matrix plus one buffer. Repeated (user, item) pairs keep the
+    last rating and timestamp in file order. Ratings below `min_rating` are dropped
+    and `binarize` stores 1.0 for every kept interaction.
+    """
+    # Raw ids get dense indices in order of first appearance, as in preprocess()
+    users, items = IdIndex([]), IdIndex([])
+    merged = None
+    pending, pending_rows = [], 0
+
+    reader = pd.read_csv(os.path.expanduser(path), sep=sep, names=COLUMNS, dtype=DTYPES,
+                         chunksize=chunksize)
+    for chunk in reader:
+        if min_rating is not None:
+            chunk = chunk[chunk["rating"] >= min_rating]
+        if chunk.empty:
+            continue
+
+        rows = users.extend(chunk["user"].to_numpy()).astype(np.int32)
+        cols = items.extend(chunk["item"].to_numpy()).astype(np.int32)
+        data = np.ones(len(chunk), dtype=np.float32) if binarize else chunk["rating"].to_numpy()
+        pending.append((rows, cols, data, chunk["timestamp"].to_numpy()))
+        pending_rows += len(chunk)
+
+        if pending_rows >= buffer_size:
+            merged = _merge(([merged] if merged is not None else []) + pending)
+            pending, pending_rows = [], 0
+
+    if pending or merged is None:
+        empty = (np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.float32), np.empty(0, np.int64))
+        merged = _merge(([merged] if merged is not None else [empty]) + pending)
+
+    rows, cols, data, timestamps = merged
+    shape = (len(users), len(items))
+    indptr = np.zeros(shape[0] + 1, dtype=np.int64 if len(rows) > np.iinfo(np.int32).max else np.int32)
+    np.cumsum(np.bincount(rows, minlength=shape[0]), out=indptr[1:])
+
+    matrix = csr_matrix((data, cols, indptr), shape=shape)
+    timestamp_csr = csr_matrix((timestamps, cols, indptr), shape=shape)
+    return Interactions(matrix, users, items, timestamp_csr)
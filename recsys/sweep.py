@@ -0,0 +1,254 @@
+import argparse
+import csv
+import itertools
+import multiprocessing as mp
+import os
+import sys
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from dataset_cache import load_interactions
+from splitting import split_csr
+
+K = 10
+BLAS_THREAD_VARS = ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS")
+SEARCH_SPACES = {
+    "ALS": {
+        "factors": [20, 50, 100],
+        "iterations": [10, 20],
+        "regularization": [0.001, 0.01, 0.1],
+    },
+    "LightFM": {
+        "no_components": [20, 50, 100],
+        "epochs": [10, 20],
+        "learning_rate": [0.01, 0.05, 0.1],
+    },
+}
+
+
+# ----------------- Shared Memory -----------------
+def share_csr(matrix, blocks):
+    """Copy CSR arrays into shared memory once; workers map them without unpickling."""
+    spec = {"shape": matrix.shape}
+    for name in ("data", "indices", "indptr"):
+        array = getattr(matrix, name)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        blocks.append(block)
+        spec[name] = (block.name, array.dtype.str, array.shape)
+    return spec
+
+
+def attach_block(name):
+    """Map an existing segment without registering it with this process's resource tracker.
+
+    Only the parent creates and unlinks segments. A registration from a worker
+    would make its tracker warn about leaks and unlink the segment when the
+    worker exits, or, when the tracker is shared with the parent, drop the
+    parent's own registration. Before Python 3.13 the worker must have called
+    untrack_shared_memory first.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def untrack_shared_memory():
+    # Pre-3.13 SharedMemory always registers on attach; only called in pool workers,
+    # which never create segments, so the patch lives and dies with the worker process
+    register = resource_tracker.register
+
+    def register_untracked(name, rtype):
+        if rtype != "shared_memory":
+            register(name, rtype)
+
+    resource_tracker.register = register_untracked
+
+
+def attach_csr(spec, blocks):
+    arrays = {}
+    for name in ("data", "indices", "indptr"):
+        block_name, dtype, shape = spec[name]
+        block = attach_block(block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=spec["shape"], copy=False)
+
+
+@contextmanager
+def blas_threads(threads):
+    # BLAS pools are sized when numpy loads, so spawned workers must inherit the limit
+    saved = {var: os.environ.get(var) for var in BLAS_THREAD_VARS}
+    os.environ.update(dict.fromkeys(BLAS_THREAD_VARS, str(threads)))
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def limit_blas_threads(threads):
+    """Pool initializer capping BLAS / OpenMP pools in a worker whose numpy is already loaded.
+
+    For pools that start workers lazily, after a blas_threads block has exited.
+    """
+    from threadpoolctl import threadpool_limits
+
+    os.environ.update(dict.fromkeys(BLAS_THREAD_VARS, str(threads)))
+    threadpool_limits(threads)
+
+
+# ----------------- Worker -----------------
+_worker = {}
+
+
+def _init_worker(train_spec, test_spec, threads):
+    if sys.version_info < (3, 13):
+        untrack_shared_memory()
+    _worker["blocks"] = []
+    _worker["train"] = attach_csr(train_spec, _worker["blocks"])
+    _worker["test"] = attach_csr(test_spec, _worker["blocks"])
+    _worker["threads"] = threads
+
+
+def _fit_and_score(model_name, params, train, test, threads):
+    from evaluation import als_recommend_block, evaluate_ranking
+    from scoring import factor_recommend_block, lightfm_factors
+
+    start = time.perf_counter()
+    if model_name == "ALS":
+        from implicit.als import AlternatingLeastSquares
+
+        model = AlternatingLeastSquares(num_threads=threads, **params)
+        model.fit(train, show_progress=False)
+        recommend = als_recommend_block(model, train)
+    else:
+        from lightfm import LightFM
+
+        params = dict(params)
+        epochs = params.pop("epochs")
+        model = LightFM(loss="warp", **params)
+        model.fit(train, epochs=epochs, num_threads=threads)
+        recommend = factor_recommend_block(lightfm_factors(model), exclude=train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    metrics = evaluate_ranking(recommend, test, ks=(K,), show_progress=False)[K]
+    return fit_seconds, time.perf_counter() - start, metrics
+
+
+def run_trial(trial):
+    trial_id, model_name, params = trial
+    start = time.perf_counter()
+    fit_seconds, eval_seconds, metrics = _fit_and_score(
+        model_name, params, _worker["train"], _worker["test"], _worker["threads"])
+    return {
+        "trial": trial_id,
+        "model": model_name,
+        **params,
+        **{f"{name}@{K}": value for name, value in metrics.items()},
+        "fit_seconds": fit_seconds,
+        "eval_seconds": eval_seconds,
+        "wall_seconds": time.perf_counter() - start,
+        "pid": os.getpid(),
+    }
+
+
+# ----------------- Search -----------------
+def grid(space):
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def random_search(space, n_trials, seed=None):
+    # Distinct parameter sets drawn from the grid; at most the whole grid
+    candidates = grid(space)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(candidates), min(n_trials, len(candidates)), replace=False)
+    return [candidates[i] for i in picks]
+
+
+def sweep(model_name, train, test, trials, workers=None, threads=None):
+    """Run every parameter set on a spawn process pool; train/test live in shared memory.
+
+    Worker BLAS/model threads default to cpu_count // workers so the pool does
+    not oversubscribe the machine.
+    """
+    workers = workers or min(len(trials), os.cpu_count() or 1)
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    blocks = []
+    try:
+        train_spec = share_csr(train, blocks)
+        test_spec = share_csr(test, blocks)
+        tasks = [(i, model_name, params) for i, params in enumerate(trials)]
+        with blas_threads(threads):
+            pool = mp.get_context("spawn").Pool(workers, _init_worker, (train_spec, test_spec, threads))
+        try:
+            results = []
+            for result in pool.imap_unordered(run_trial, tasks):
+                print(f"  trial {result['trial']:>3}: ndcg@{K}={result[f'ndcg@{K}']:.4f} "
+                      f"({result['wall_seconds']:.1f}s)")
+                results.append(result)
+            # Workers exit on their own; terminate() (what `with pool:` does) leaks their semaphores
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return sorted(results, key=lambda row: row["trial"])
+
+
+def write_table(results, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep for ALS / LightFM.")
+    parser.add_argument("--model", choices=list(SEARCH_SPACES), default="ALS")
+    parser.add_argument("--data", default="u.data")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--trials", type=int, default=10, help="number of random-search trials")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None, help="threads per worker")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    print("📥 Loading and splitting data...")
+    train, test = split_csr(load_interactions(args.data).matrix, seed=args.seed)
+    train.data = train.data.astype(np.float32)
+
+    space = SEARCH_SPACES[args.model]
+    trials = grid(space) if args.search == "grid" else random_search(space, args.trials, args.seed)
+    print(f"🔍 Running {len(trials)} {args.model} trials...")
+    start = time.perf_counter()
+    results = sweep(args.model, train, test, trials, args.workers, args.threads)
+    print(f"⏱️  Sweep took {time.perf_counter() - start:.1f}s")
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "outputs",
+                                         f"sweep_{args.model.lower()}.csv")
+    write_table(results, output)
+    best = max(results, key=lambda row: row[f"ndcg@{K}"])
+    print(f"🏆 Best NDCG@{K}: {best[f'ndcg@{K}']:.4f} with "
+          + ", ".join(f"{name}={best[name]}" for name in space))
+    print(f"📄 Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import numpy as np
+from scipy.sparse import random as sparse_random
+
+from dataset_cache import csr_to_arrays
+from fold_in import IncrementalUpdater, load_state
+from model_registry import publish
+
+
+def test_fold_in_existing_raw_id_keeps_user_count(tmp_path):
+    # A train.py-style version: no id mappings, row/column i is raw id i + 1
+    rng = np.random.default_rng(0)
+    n_users, n_items, n_factors = 6, 8, 3
+    interactions = sparse_random(n_users, n_items, density=0.4, format="csr", dtype=np.float32, random_state=0)
+    interactions.data[:] = 1.0
+    arrays = {"user_vectors": rng.normal(size=(n_users, n_factors)).astype(np.float32),
+              "item_vectors": rng.normal(size=(n_items, n_factors)).astype(np.float32),
+              **csr_to_arrays(interactions, "interactions_")}
+    publish("ALS", arrays, {"dataset": {"name": "movielens", "raw_id_offset": 1}}, artifact_dir=str(tmp_path))
+
+    state, _ = load_state("ALS", artifact_dir=str(tmp_path))
+    updater = IncrementalUpdater(state, regularization=0.1)
+    # Raw user 6 / item 8 are the last rows of the dataset layout, not new ids
+    new_state = updater.apply(np.array([n_users]), np.array([n_items]), np.array([1.0]))
+
+    assert len(new_state.users) == n_users
+    assert len(new_state.items) == n_items
+    assert new_state.interactions[n_users - 1, n_items - 1] == 1.0
+    np.testing.assert_array_equal(new_state.user_factors[:-1], state.user_factors[:-1])
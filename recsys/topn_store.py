@@ -0,0 +1,86 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"RECTOPN1"
+# magic, header size, number of users, list length
+_PREFIX = struct.Struct("<8sIQI")
+HEADER_SIZE = 4096
+
+
+# ----------------- Writing -----------------
+class TopNWriter:
+    """Fills a fixed-width top-N file chunk by chunk through memory maps.
+
+    Layout: a HEADER_SIZE-byte header (binary prefix + JSON metadata with the
+    model version), then int32 items[n_users, n] and float32 scores[n_users, n].
+    The file is written under a temporary name and renamed on close().
+    """
+
+    def __init__(self, path, n_users, n, model_version, meta=None):
+        self.path = path
+        self.tmp_path = f"{path}.tmp-{os.getpid()}"
+        header = json.dumps({"model_version": model_version, **(meta or {})}).encode()
+        if _PREFIX.size + len(header) > HEADER_SIZE:
+            raise ValueError("Top-N store metadata does not fit in the header")
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(self.tmp_path, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, HEADER_SIZE, n_users, n))
+            f.write(header.ljust(HEADER_SIZE - _PREFIX.size, b" "))
+        self.items, self.scores = _map_arrays(self.tmp_path, n_users, n, mode="r+", create=True)
+        self.items[:] = -1
+
+    def write(self, start, ids, scores):
+        self.items[start:start + len(ids)] = ids
+        self.scores[start:start + len(ids)] = scores
+
+    def close(self):
+        self.items.flush()
+        self.scores.flush()
+        del self.items, self.scores
+        os.replace(self.tmp_path, self.path)
+
+
+def _map_arrays(path, n_users, n, mode="r", create=False):
+    items_bytes = n_users * n * 4
+    if create:
+        with open(path, "r+b") as f:
+            f.truncate(HEADER_SIZE + 2 * items_bytes)
+    items = np.memmap(path, dtype=np.int32, mode=mode, offset=HEADER_SIZE, shape=(n_users, n))
+    scores = np.memmap(path, dtype=np.float32, mode=mode, offset=HEADER_SIZE + items_bytes,
+                       shape=(n_users, n))
+    return items, scores
+
+
+# ----------------- Reading -----------------
+class TopNStore:
+    """Read-only view of a top-N file; one row slice per user lookup."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, header_size, n_users, n = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a top-N store")
+            self.meta = json.loads(f.read(header_size - _PREFIX.size).decode().strip())
+        self.path = path
+        self.n_users, self.n = n_users, n
+        self.items, self.scores = _map_arrays(path, n_users, n)
+
+    @property
+    def model_version(self):
+        return self.meta["model_version"]
+
+    def __contains__(self, user):
+        return 0 <= user < self.n_users
+
+    def lookup(self, user, n=None):
+        items = self.items[user, :n]
+        valid = items >= 0
+        return np.asarray(items[valid]), np.asarray(self.scores[user, :n][valid])
+
+    def lookup_many(self, users, n=None):
+        users = np.asarray(users)
+        return np.asarray(self.items[users, :n]), np.asarray(self.scores[users, :n])
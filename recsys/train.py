@@ -0,0 +1,81 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, hstack, identity
+
+from dataset_cache import load_movielens
+from model_registry import publish_factors
+from scoring import als_factors, lightfm_factors
+
+NUM_THREADS = 4
+MIN_RATING = 4.0
+ITEMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ml-100k", "u.item")
+N_GENRES = 19
+
+
+# ----------------- Item Features -----------------
+def genre_item_features(path=ITEMS_PATH):
+    """LightFM item features: a per-item identity column plus the 19 u.item genre flags, rows normalized.
+
+    Row i is item id i + 1, matching the fetch_movielens item indices.
+    """
+    items = pd.read_csv(path, sep="|", header=None, encoding="latin-1")
+    genres = csr_matrix(items.iloc[:, -N_GENRES:].to_numpy(dtype=np.float32))
+    features = hstack([identity(len(items), dtype=np.float32, format="csr"), genres]).tocsr()
+    features = features.multiply(1.0 / np.asarray(features.sum(axis=1))).tocsr()
+    return features.astype(np.float32)
+
+
+# ----------------- Trainers -----------------
+def train_als(train, factors=20, regularization=0.1, iterations=20):
+    from implicit.als import AlternatingLeastSquares
+
+    model = AlternatingLeastSquares(factors=factors, regularization=regularization, iterations=iterations)
+    model.fit(train)
+    params = {"factors": factors, "regularization": regularization, "iterations": iterations}
+    return als_factors(model), params
+
+
+def train_lightfm(train, no_components=20, epochs=10, item_features=None):
+    from lightfm import LightFM
+
+    model = LightFM(no_components=no_components, loss='warp')
+    model.fit(train, item_features=item_features, epochs=epochs, num_threads=NUM_THREADS)
+    params = {"no_components": no_components, "loss": "warp", "epochs": epochs,
+              "item_features": "genres" if item_features is not None else None}
+    # Item representations already sum in the feature embeddings, so serving needs no features
+    return lightfm_factors(model, item_features=item_features), params
+
+
+TRAINERS = {"ALS": train_als, "LightFM": train_lightfm}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train recommenders and publish them to the model registry.")
+    parser.add_argument("--models", nargs="+", default=list(TRAINERS), choices=list(TRAINERS))
+    parser.add_argument("--genres", action="store_true", help="train LightFM with u.item genre features")
+    args = parser.parse_args()
+
+    print("📥 Loading data...")
+    train, _, _ = load_movielens(min_rating=MIN_RATING)
+
+    for name in args.models:
+        print(f"🧠 Training {name} model...")
+        start = time.time()
+        options = {"item_features": genre_item_features()} if name == "LightFM" and args.genres else {}
+        factors, params = TRAINERS[name](train, **options)
+        version = publish_factors(name, factors, meta={
+            "params": params,
+            # fetch_movielens drops no ids: row/column i is raw user/item id i + 1
+            "dataset": {"name": "movielens", "min_rating": MIN_RATING, "shape": list(train.shape),
+                        "raw_id_offset": 1},
+            "train_seconds": time.time() - start,
+        })
+        print(f"✅ Published {name} version {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import time
+
+import numpy as np
+
+from scoring import factor_score_items, top_k_scores
+
+N_CANDIDATES = 300
+N = 10
+BATCH_SIZE = 1024
+
+
+class TwoStageRecommender:
+    """Cheap retrieval of `n_candidates` items per user, then re-ranking with a second model.
+
+    Stage one scores the whole catalogue with the retrieval factors (ALS), or
+    asks an ann.IVFIndex built on them. Stage two scores only those candidates
+    with the ranking factors (LightFM, optionally with genre features) and keeps
+    the final top-n. Per-batch wall time of each stage is kept in `timings`.
+    """
+
+    def __init__(self, retrieval_factors, ranking_factors, n_candidates=N_CANDIDATES, exclude=None,
+                 index=None, batch_size=BATCH_SIZE):
+        self.retrieval_factors = retrieval_factors
+        self.score_items = factor_score_items(ranking_factors)
+        self.n_candidates = n_candidates
+        self.exclude = exclude
+        self.index = index
+        self.batch_size = batch_size
+        self.timings = {"retrieval": [], "ranking": []}
+
+    def retrieve(self, users):
+        user_vectors, item_vectors, user_biases, item_biases = self.retrieval_factors
+        if self.index is not None:
+            ids, _ = self.index.search(user_vectors[users], self.n_candidates, exclude=self.exclude, users=users)
+            return ids
+        ids, _ = top_k_scores(user_vectors, item_vectors, users, self.n_candidates, user_biases, item_biases,
+                              exclude=self.exclude, chunk_size=self.batch_size)
+        return ids
+
+    def rank(self, users, candidates, n):
+        scores = self.score_items(users, np.maximum(candidates, 0)).astype(np.float32)
+        scores[candidates < 0] = -np.inf
+        n = min(n, candidates.shape[1])
+        order = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+        order = np.take_along_axis(order, np.argsort(-np.take_along_axis(scores, order, axis=1), axis=1), axis=1)
+        ids = np.take_along_axis(candidates, order, axis=1)
+        top_scores = np.take_along_axis(scores, order, axis=1)
+        ids[~np.isfinite(top_scores)] = -1
+        return ids, top_scores
+
+    def recommend(self, users, n=N):
+        """(ids, scores) arrays of shape (len(users), n); -1 ids pad short candidate lists."""
+        users = np.asarray(users, dtype=np.int64)
+        ids = np.full((len(users), n), -1, dtype=np.int32)
+        scores = np.full((len(users), n), -np.inf, dtype=np.float32)
+        for start in range(0, len(users), self.batch_size):
+            block = users[start:start + self.batch_size]
+            begin = time.perf_counter()
+            candidates = self.retrieve(block)
+            retrieved = time.perf_counter()
+            block_ids, block_scores = self.rank(block, candidates, n)
+            self.timings["retrieval"].append(retrieved - begin)
+            self.timings["ranking"].append(time.perf_counter() - retrieved)
+            ids[start:start + len(block), :block_ids.shape[1]] = block_ids
+            scores[start:start + len(block), :block_scores.shape[1]] = block_scores
+        return ids, scores
+
+    def recommend_block(self):
+        # Adapter for evaluation.evaluate_ranking
+        return lambda users, k: self.recommend(users, k)[0]
+
+    def latency_report(self):
+        report = {}
+        for stage, samples in self.timings.items():
+            if samples:
+                samples = np.asarray(samples) * 1000
+                p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+                report[stage] = {"batches": len(samples), "total_ms": samples.sum(), "p50_ms": p50,
+                                 "p95_ms": p95, "p99_ms": p99}
+        return report
+
+
+def main():
+    from ann import IVFIndex
+    from dataset_cache import load_movielens
+    from evaluation import evaluate_ranking
+    from model_registry import load_factors
+    from scoring import factor_recommend_block
+
+    parser = argparse.ArgumentParser(description="ALS candidates re-ranked by LightFM, from the model registry.")
+    parser.add_argument("--candidates", type=int, default=N_CANDIDATES)
+    parser.add_argument("--n", type=int, default=N)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--ann", action="store_true", help="retrieve from an IVF index over the ALS items")
+    args = parser.parse_args()
+
+    print("📥 Loading data and published models...")
+    train, test, _ = load_movielens(min_rating=4.0)
+    als, als_meta = load_factors("ALS", mmap=False)
+    lightfm, lightfm_meta = load_factors("LightFM", mmap=False)
+    print(f"  ALS {als_meta['version']} -> LightFM {lightfm_meta['version']} "
+          f"(item features: {lightfm_meta['params'].get('item_features')})")
+
+    index = IVFIndex.build(als[1], seed=0) if args.ann else None
+    pipeline = TwoStageRecommender(als, lightfm, args.candidates, exclude=train, index=index,
+                                   batch_size=args.batch_size)
+
+    print(f"🔎 Two-stage ({args.candidates} candidates):")
+    results = evaluate_ranking(pipeline.recommend_block(), test, ks=(args.n,), batch_size=args.batch_size,
+                               show_progress=False)[args.n]
+    print("  " + "  ".join(f"{name}@{args.n}={value:.4f}" for name, value in results.items()))
+    for stage, stats in pipeline.latency_report().items():
+        print(f"  {stage:<10} {stats['total_ms']:8.1f} ms total, p50 {stats['p50_ms']:.2f} ms / batch "
+              f"of {args.batch_size}")
+
+    print("📏 LightFM over the full catalogue:")
+    start = time.perf_counter()
+    results = evaluate_ranking(factor_recommend_block(lightfm, exclude=train, chunk_size=args.batch_size), test,
+                               ks=(args.n,), batch_size=args.batch_size, show_progress=False)[args.n]
+    print("  " + "  ".join(f"{name}@{args.n}={value:.4f}" for name, value in results.items()))
+    print(f"  {(time.perf_counter() - start) * 1000:.1f} ms total")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,11 +10,16 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# The recommender modules (scoring, model_registry, ...) live in recsys/ as flat scripts
+RECSYS_DIR = BASE_DIR / 'recsys'
+sys.path.insert(0, str(RECSYS_DIR))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -37,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'recommendations',
 ]
 
 MIDDLEWARE = [
@@ -120,3 +126,23 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Recommendation API
+# Requests arriving within the window are scored as one batch (serve with ASGI)
+
+RECOMMENDATION_BATCH_WINDOW_MS = 2
+
+RECOMMENDATION_MAX_BATCH = 256
+
+# How often (seconds) the published LATEST version is re-checked; a new version is loaded on the next request
+
+RECOMMENDATION_VERSION_CHECK_SECONDS = 1.0
+
+# Result cache: LRU memory bound, optional TTL (seconds) and shared on-disk tier
+
+RECOMMENDATION_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+RECOMMENDATION_CACHE_TTL = 600
+
+RECOMMENDATION_CACHE_DIR = None